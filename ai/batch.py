@@ -0,0 +1,185 @@
+"""
+FitAI - Batch Plan Generation
+
+Fans rule-based plan generation (Mode A) out across a process pool
+so large batches, such as the weekly regeneration run, don't execute
+serially on the event loop.
+
+Workers are started from a forkserver, not forked from the service:
+by the time the pool is created the service runs threads (Gemini SDK
+calls, startup initialization), and a lock held by one of them at fork
+time would deadlock the child.
+
+Workers keep the catalogs they have been sent, keyed by catalog
+version, so tasks carry only their entries; pickling the catalog with
+every chunk would cost as much as generating the chunk's plans.
+"""
+
+import os
+import uuid
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+
+from generator import WorkoutPlanGenerator, ExerciseIndex
+
+# Catalogs kept per worker process (inline exercise lists get one-off keys)
+WORKER_CATALOGS = 4
+
+# One generator per worker process, created on first use
+_worker_generator = None
+_worker_catalogs: "OrderedDict[str, ExerciseIndex]" = OrderedDict()
+
+
+def _generate_chunk(
+    catalog_key: str,
+    entries: List[Dict[str, Any]],
+    exercises: Union[List[Dict[str, Any]], ExerciseIndex, None] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Generate plans for a chunk of entries inside a worker process
+
+    exercises is sent only until the worker has cached catalog_key;
+    returns None when it is missing, so the caller resends with it.
+    """
+    global _worker_generator
+
+    if _worker_generator is None:
+        _worker_generator = WorkoutPlanGenerator()
+
+    if exercises is not None:
+        # A list is indexed once here rather than filtered for every plan
+        if not isinstance(exercises, ExerciseIndex):
+            exercises = ExerciseIndex(exercises)
+        _worker_catalogs[catalog_key] = exercises
+        while len(_worker_catalogs) > WORKER_CATALOGS:
+            _worker_catalogs.popitem(last=False)
+    else:
+        exercises = _worker_catalogs.get(catalog_key)
+        if exercises is None:
+            return None
+    _worker_catalogs.move_to_end(catalog_key)
+
+    results = []
+    for entry in entries:
+        try:
+            plan = _worker_generator.generate_plan(
+                profile=entry['profile'],
+                exercises=exercises,
+                week_start=entry['week_start'],
+                seed=entry['seed']
+            )
+            results.append({'index': entry['index'], 'plan': plan})
+        except Exception as e:
+            results.append({'index': entry['index'], 'error': str(e)})
+
+    return results
+
+
+class BatchPlanRunner:
+    """
+    Runs plan generation for many entries on a shared process pool
+
+    Entries are split into small chunks so results can be streamed
+    back as soon as each chunk completes. The pool is created lazily
+    and reused across requests, and replaced if a worker dies.
+
+    Settings (environment):
+    - FITAI_BATCH_WORKERS: pool size (default: CPU count)
+    - FITAI_BATCH_CHUNK_SIZE: entries per task (default: 8)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self.max_workers = max_workers or int(
+            os.environ.get('FITAI_BATCH_WORKERS', 0)
+        ) or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size or int(
+            os.environ.get('FITAI_BATCH_CHUNK_SIZE', 8)
+        ))
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+        return self._executor
+
+    async def run(
+        self,
+        exercises: Union[List[Dict[str, Any]], ExerciseIndex],
+        entries: List[Dict[str, Any]],
+        catalog_key: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate plans for all entries, yielding results as they complete
+
+        Args:
+            exercises: Shared exercise list or catalog index
+            entries: Dicts with index, profile, week_start and seed
+            catalog_key: Catalog version, so workers reuse the catalog
+                across runs (default: a key for this run only)
+
+        Yields:
+            Dicts with index and either plan or error; a chunk that fails
+            as a whole (worker died, result not picklable) yields an
+            error for each of its entries
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        catalog_key = catalog_key or uuid.uuid4().hex
+
+        def submit(chunk, with_catalog):
+            try:
+                return loop.run_in_executor(
+                    executor, _generate_chunk, catalog_key, chunk, exercises if with_catalog else None
+                )
+            except Exception as e:
+                # Pool already broken: fail the chunk like a failed task
+                future = loop.create_future()
+                future.set_exception(e)
+                return future
+
+        # The first wave (about one chunk per idle worker) carries the catalog
+        chunks = {}
+        for n, i in enumerate(range(0, len(entries), self.chunk_size)):
+            chunk = entries[i:i + self.chunk_size]
+            chunks[submit(chunk, n < self.max_workers)] = chunk
+
+        pending = set(chunks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                chunk = chunks.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool) and self._executor is executor:
+                        # Unusable from now on; the next run starts a new pool
+                        print(f"⚠ Batch process pool broken: {e}")
+                        self._executor = None
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    results = [{'index': entry['index'], 'error': str(e) or type(e).__name__} for entry in chunk]
+                if results is None:
+                    # This worker has not seen the catalog yet
+                    retry = submit(chunk, True)
+                    chunks[retry] = chunk
+                    pending.add(retry)
+                    continue
+                for result in results:
+                    yield result
+
+    def shutdown(self):
+        """Shut down the process pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
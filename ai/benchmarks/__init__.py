@@ -0,0 +1,6 @@
+"""
+FitAI - AI service benchmarks
+
+Run from the ai/ directory, e.g.:
+    python -m benchmarks.catalog_scaling
+"""
@@ -0,0 +1,88 @@
+"""
+Batch plan generation on the process pool against a serial loop
+
+Generates --entries plans from a --catalog-size catalog index serially
+in process, then through BatchPlanRunner (first run: pool start-up and
+catalog sent to each worker; second run: workers reuse their cached
+catalog). Checks the batch plans match the serial ones, and asserts
+the warm batch run beats the serial loop when more than one worker can
+run at once. On a single core nothing runs in parallel and returning
+the plans from the workers is pure overhead, so it asserts the
+slowdown stays under --max-overhead instead (sending the catalog with
+every chunk used to make it about 4x).
+Usage:
+    python -m benchmarks.batch_scaling [--entries 2000] [--catalog-size 5000]
+        [--workers N] [--max-overhead 1.0]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+from batch import BatchPlanRunner
+from catalog import ExerciseCatalog
+from generator import WorkoutPlanGenerator
+from benchmarks.synthetic import make_catalog, make_profile, GOALS, LEVELS, DAYS_PER_WEEK
+
+
+def _entries(count: int):
+    combos = [(g, l, d) for g in GOALS for l in LEVELS for d in DAYS_PER_WEEK]
+    return [
+        {'index': i, 'profile': make_profile(*combos[i % len(combos)]), 'week_start': '2026-01-05', 'seed': i}
+        for i in range(count)
+    ]
+
+
+async def _batch(runner: BatchPlanRunner, catalog: ExerciseCatalog, entries):
+    start = time.perf_counter()
+    results = [result async for result in runner.run(catalog.index, entries, catalog.version)]
+    return time.perf_counter() - start, results
+
+
+def run(args):
+    catalog = ExerciseCatalog(make_catalog(args.catalog_size))
+    entries = _entries(args.entries)
+    workers = args.workers or os.cpu_count() or 1
+
+    generator = WorkoutPlanGenerator()
+    start = time.perf_counter()
+    serial = [
+        generator.generate_plan(entry['profile'], catalog.index, entry['week_start'], entry['seed'])
+        for entry in entries
+    ]
+    serial_sec = time.perf_counter() - start
+
+    runner = BatchPlanRunner(max_workers=workers)
+    try:
+        cold_sec, _ = asyncio.run(_batch(runner, catalog, entries))
+        warm_sec, results = asyncio.run(_batch(runner, catalog, entries))
+    finally:
+        runner.shutdown()
+
+    assert sorted(results, key=lambda r: r['index']) == [
+        {'index': i, 'plan': plan} for i, plan in enumerate(serial)
+    ], "batch plans differ from serial plans"
+
+    parallel = min(workers, os.cpu_count() or 1)
+    print(f"{args.entries} plans, catalog {args.catalog_size} exercises, {workers} workers, {os.cpu_count()} CPUs")
+    print(f"  serial          {serial_sec:7.2f} s")
+    print(f"  batch, cold     {cold_sec:7.2f} s  ({serial_sec / cold_sec:.2f}x)")
+    print(f"  batch, warm     {warm_sec:7.2f} s  ({serial_sec / warm_sec:.2f}x)")
+
+    if parallel > 1:
+        assert warm_sec < serial_sec, "batch path is slower than the serial loop"
+    else:
+        assert warm_sec < serial_sec * (1 + args.max_overhead), (
+            f"batch overhead {warm_sec / serial_sec - 1:.0%} over {args.max_overhead:.0%} on one core"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--catalog-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, help='pool size (default: CPU count)')
+    parser.add_argument('--max-overhead', type=float, default=1.0,
+                        help='allowed slowdown when only one worker can run')
+    run(parser.parse_args())
@@ -0,0 +1,58 @@
+"""
+Per-plan generation cost as the exercise catalog grows
+
+Compares plans generated from a prebuilt ExerciseIndex (the catalog
+path) with plans generated from a plain exercise list, which has to
+be filtered and grouped on every request.
+
+Usage:
+    python -m benchmarks.catalog_scaling [--plans 200]
+"""
+
+import argparse
+import time
+
+from generator import WorkoutPlanGenerator, ExerciseIndex
+from benchmarks.synthetic import make_catalog, make_profile
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def _time_plans(generator, exercises, plans: int) -> float:
+    """Average milliseconds per generate_plan call"""
+    profile = make_profile('muscle_gain', 'advanced', 6)
+
+    start = time.perf_counter()
+    for i in range(plans):
+        generator.generate_plan(
+            profile=profile,
+            exercises=exercises,
+            week_start='2026-01-05',
+            seed=i
+        )
+    return (time.perf_counter() - start) * 1000 / plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plans', type=int, default=200, help='plans per catalog size')
+    args = parser.parse_args()
+
+    generator = WorkoutPlanGenerator()
+
+    print(f"{'catalog':>9} {'index build ms':>15} {'indexed ms/plan':>16} {'list ms/plan':>13}")
+    for size in SIZES:
+        catalog = make_catalog(size)
+
+        start = time.perf_counter()
+        index = ExerciseIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        indexed_ms = _time_plans(generator, index, args.plans)
+        list_ms = _time_plans(generator, catalog, max(1, args.plans // 10))
+
+        print(f"{size:>9} {build_ms:>15.1f} {indexed_ms:>16.3f} {list_ms:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
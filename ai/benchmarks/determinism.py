@@ -0,0 +1,81 @@
+"""
+Concurrency check for deterministic plan generation
+
+Generates thousands of plans serially, then again from a thread pool
+and a process pool sharing one generator/catalog, and verifies that the
+serialized output is byte-identical. Exits non-zero on any mismatch.
+
+Usage:
+    python -m benchmarks.determinism [--plans 5000] [--workers 16]
+"""
+
+import sys
+import json
+import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from generator import WorkoutPlanGenerator, ExerciseIndex
+from benchmarks.synthetic import make_catalog, make_profile, GOALS, LEVELS, DAYS_PER_WEEK
+
+generator = WorkoutPlanGenerator()
+index = ExerciseIndex(make_catalog(1_000))
+
+
+def _plan_bytes(i: int) -> bytes:
+    """Serialized plan (or adjusted plan) for job i"""
+    profile = make_profile(
+        GOALS[i % len(GOALS)],
+        LEVELS[(i // 3) % len(LEVELS)],
+        DAYS_PER_WEEK[(i // 9) % len(DAYS_PER_WEEK)]
+    )
+    # Same seed derivation as main.py
+    seed = int(hashlib.md5(f"{i}-2026-01-05".encode()).hexdigest()[:8], 16)
+
+    if i % 2:
+        plan = generator.generate_adjusted_plan(
+            profile=profile,
+            exercises=index,
+            week_start='2026-01-05',
+            previous_plan={},
+            logs_summary={'completion_rate': i % 101, 'average_fatigue': 1 + i % 5},
+            seed=seed
+        )
+    else:
+        plan = generator.generate_plan(
+            profile=profile,
+            exercises=index,
+            week_start='2026-01-05',
+            seed=seed
+        )
+
+    return json.dumps(plan, ensure_ascii=False).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plans', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    jobs = range(args.plans)
+    serial = [_plan_bytes(i) for i in jobs]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        threaded = list(pool.map(_plan_bytes, jobs))
+
+    with ProcessPoolExecutor() as pool:
+        processes = list(pool.map(_plan_bytes, jobs, chunksize=64))
+
+    failures = 0
+    for name, results in (('threads', threaded), ('processes', processes)):
+        mismatches = [i for i in jobs if results[i] != serial[i]]
+        failures += len(mismatches)
+        status = 'OK' if not mismatches else f"{len(mismatches)} mismatches (first: job {mismatches[0]})"
+        print(f"{name:>9}: {args.plans} plans, {status}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
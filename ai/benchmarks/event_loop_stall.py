@@ -0,0 +1,101 @@
+"""
+Event-loop responsiveness while chat calls are in flight
+
+Replaces the chat model with a stub whose send_message blocks for
+--chat-latency seconds, starts --chats concurrent /chat requests and,
+while they are running, measures /health and Mode-A /generate_plan
+latency. Baseline latencies (no chat load) are printed for comparison.
+
+Requires httpx (pip install httpx). Usage:
+    python -m benchmarks.event_loop_stall [--chats 50] [--chat-latency 2]
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+import main
+from benchmarks.synthetic import make_catalog, make_profile
+
+
+class _SlowChat:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def send_message(self, message):
+        time.sleep(self.latency)
+        return type('Response', (), {'text': 'ok'})()
+
+
+class _SlowModel:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def start_chat(self, history=None):
+        return _SlowChat(self.latency)
+
+
+async def _probe(client, plan_request, samples: int, interval: float):
+    """Latency in ms of alternating /health and /generate_plan calls"""
+    health, plans = [], []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await client.get('/health')
+        health.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        response = await client.post('/generate_plan', json=plan_request)
+        response.raise_for_status()
+        plans.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.sleep(interval)
+    return health, plans
+
+
+def _report(label: str, health, plans):
+    print(f"{label:>10}: /health p50 {statistics.median(health):7.1f} ms  max {max(health):7.1f} ms"
+          f"  | /generate_plan p50 {statistics.median(plans):7.1f} ms  max {max(plans):7.1f} ms")
+
+
+async def run(chats: int, chat_latency: float):
+    # Chat uses the stub; plan generation stays Mode A only
+    main.chat_handler.model = _SlowModel(chat_latency)
+
+    plan_request = {
+        'user_id': 1,
+        'week_start': '2026-01-05',
+        'profile': make_profile('muscle_gain', 'intermediate', 4),
+        'exercises': make_catalog(200)
+    }
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        _report('idle', *await _probe(client, plan_request, 10, 0.05))
+
+        chat_tasks = [
+            asyncio.create_task(client.post('/chat', json={'message': f'hi {i}'}))
+            for i in range(chats)
+        ]
+        await asyncio.sleep(0.1)
+
+        samples = max(5, int(chat_latency / 0.1))
+        _report(f'{chats} chats', *await _probe(client, plan_request, samples, 0.05))
+
+        start = time.perf_counter()
+        await asyncio.gather(*chat_tasks)
+        print(f"chat calls finished {time.perf_counter() - start:.1f} s after probing ended")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--chat-latency', type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.chat_latency))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,213 @@
+"""
+Microbenchmarks for the rule-based plan generator
+
+run: times generate_plan (exercise list and prebuilt index),
+generate_adjusted_plan, _filter_exercises and _generate_day for every
+goal/level/days combination on synthetic catalogs of each size, and
+saves per-call timings as JSON.
+
+compare: reports the per-call time ratio for every case present in two
+saved runs. A function/size group whose geometric-mean ratio is more
+than --threshold percent slower is flagged as a regression (exit status
+1); individual slower cases are listed too, but are noisier.
+
+Usage:
+    python -m benchmarks.generator_bench run [--sizes 100,1000,10000,100000]
+        [--repeat 5] [--min-time 0.02] [--output generator_bench.json]
+    python -m benchmarks.generator_bench compare BASE.json NEW.json [--threshold 10]
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import platform
+import argparse
+import statistics
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from generator import WorkoutPlanGenerator, ExerciseIndex
+from benchmarks.synthetic import make_catalog, make_profile, GOALS, LEVELS, DAYS_PER_WEEK
+
+WEEK_START = '2026-01-05'
+LOGS_SUMMARY = {'completed_days': 2, 'total_days': 4, 'completion_rate': 45, 'average_fatigue': 4.2}
+PREVIOUS_PLAN = {'week_start': '2025-12-29', 'principles': [], 'days': []}
+
+
+def _time_call(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    """Per-call microseconds over repeat rounds of enough loops to last min_time"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - start) * 1e6 / loops)
+
+    return {
+        'min_us': round(min(rounds), 3),
+        'median_us': round(statistics.median(rounds), 3),
+        'loops': loops,
+        'repeat': repeat
+    }
+
+
+def _cases(generator: WorkoutPlanGenerator, catalog, index, profile) -> Dict[str, Callable[[], Any]]:
+    equipment, level, goal = profile['equipment'], profile['level'], profile['goal']
+    grouped = index.view(equipment, level)
+    split_type = generator._get_split_strategy(profile['days_per_week'])[0]
+
+    return {
+        'generate_plan': lambda: generator.generate_plan(profile, catalog, WEEK_START, 1),
+        'generate_plan[index]': lambda: generator.generate_plan(profile, index, WEEK_START, 1),
+        'generate_adjusted_plan': lambda: generator.generate_adjusted_plan(
+            profile, index, WEEK_START, PREVIOUS_PLAN, LOGS_SUMMARY, 1
+        ),
+        '_filter_exercises': lambda: generator._filter_exercises(catalog, equipment, level),
+        '_generate_day': lambda: generator._generate_day(
+            WEEK_START, split_type, grouped, goal, level, profile['session_minutes'], 0, random.Random(1)
+        ),
+    }
+
+
+def run(sizes: List[int], repeat: int, min_time: float) -> Dict[str, Any]:
+    generator = WorkoutPlanGenerator()
+    results = {}
+
+    for size in sizes:
+        catalog = make_catalog(size)
+        index = ExerciseIndex(catalog)
+        start = time.perf_counter()
+
+        for goal in GOALS:
+            for level in LEVELS:
+                for days in DAYS_PER_WEEK:
+                    profile = make_profile(goal, level, days)
+                    for name, func in _cases(generator, catalog, index, profile).items():
+                        key = f"{name}|size={size}|goal={goal}|level={level}|days={days}"
+                        results[key] = _time_call(func, repeat, min_time)
+
+        print(f"size {size:>7}: {len(GOALS) * len(LEVELS) * len(DAYS_PER_WEEK)} combinations"
+              f" in {time.perf_counter() - start:.1f}s")
+        _print_summary({k: v for k, v in results.items() if f"|size={size}|" in k})
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': repeat,
+            'min_time': min_time
+        },
+        'results': results
+    }
+
+
+def _group(key: str) -> str:
+    """Function and catalog size of a case key"""
+    name, size = key.split('|')[:2]
+    return f"{name} {size}"
+
+
+def _print_summary(results: Dict[str, Dict[str, Any]]):
+    """Geometric mean of min per-call time per function and size"""
+    groups: Dict[str, List[float]] = {}
+    for key, timing in results.items():
+        groups.setdefault(_group(key), []).append(timing['min_us'])
+
+    for group, values in groups.items():
+        mean = math.exp(sum(math.log(max(v, 1e-9)) for v in values) / len(values))
+        print(f"    {group:<40} {mean:12.1f} us")
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float, stat: str) -> int:
+    """Print ratios new/base and return the number of regressed groups"""
+    shared = [key for key in new['results'] if key in base['results']]
+    if not shared:
+        print("No cases in common")
+        return 0
+
+    ratios = {
+        key: new['results'][key][stat] / max(base['results'][key][stat], 1e-9)
+        for key in shared
+    }
+
+    groups: Dict[str, List[float]] = {}
+    for key, ratio in ratios.items():
+        groups.setdefault(_group(key), []).append(ratio)
+
+    limit = 1 + threshold / 100
+    regressed_groups = 0
+
+    print(f"{'case':<40} {'ratio (geo mean)':>17} {'worst':>8}")
+    for group, values in groups.items():
+        mean = math.exp(sum(math.log(v) for v in values) / len(values))
+        flag = ''
+        if mean > limit:
+            flag = '  REGRESSION'
+            regressed_groups += 1
+        elif mean < 1 / limit:
+            flag = '  improved'
+        print(f"{group:<40} {mean:17.3f} {max(values):8.3f}{flag}")
+
+    slower = sorted((key for key, ratio in ratios.items() if ratio > limit), key=lambda k: -ratios[k])
+    print(f"\n{len(shared)} cases compared on {stat}: {regressed_groups} of {len(groups)} groups regressed"
+          f" (> +{threshold:g}%), {len(slower)} individual cases slower")
+    for key in slower[:20]:
+        print(f"  {key}: {base['results'][key][stat]:.1f} -> {new['results'][key][stat]:.1f} us"
+              f" ({(ratios[key] - 1) * 100:+.1f}%)")
+    if len(slower) > 20:
+        print(f"  ... {len(slower) - 20} more")
+
+    missing = len(base['results']) - len(shared)
+    if missing:
+        print(f"  ({missing} cases only in base run)")
+
+    return regressed_groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='time all cases and save JSON')
+    run_parser.add_argument('--sizes', default='100,1000,10000,100000')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--min-time', type=float, default=0.02, help='seconds per timing round')
+    run_parser.add_argument('--output', default='generator_bench.json')
+
+    compare_parser = commands.add_parser('compare', help='flag regressions between two runs')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10, help='percent slowdown to flag')
+    compare_parser.add_argument('--stat', choices=['min_us', 'median_us'], default='min_us')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        sizes = [int(size) for size in args.sizes.split(',')]
+        output = run(sizes, args.repeat, args.min_time)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nSaved {len(output['results'])} cases to {args.output}")
+    else:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        sys.exit(1 if compare(base, new, args.threshold, args.stat) else 0)
+
+
+if __name__ == '__main__':
+    main()
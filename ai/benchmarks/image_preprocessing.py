@@ -0,0 +1,94 @@
+"""
+Upload size and latency effect of image preprocessing
+
+Builds synthetic phone-style photos (large noisy JPEG, EXIF-rotated JPEG,
+PNG screenshot, already-small JPEG), runs them through ImagePreprocessor
+and reports bytes before/after, preprocessing time and the estimated
+upload time at --uplink-mbps for the inline request payload (base64 on
+the wire, as the Gemini REST API sends it).
+
+Requires Pillow. Usage:
+    python -m benchmarks.image_preprocessing [--max-edge 1536] [--quality 85] [--uplink-mbps 20]
+"""
+
+import io
+import math
+import random
+import argparse
+
+from PIL import Image
+
+from image_preprocessing import ImagePreprocessor
+
+
+def _photo(width: int, height: int, seed: int) -> Image.Image:
+    """Gradient plus noise, which compresses roughly like a photo"""
+    rng = random.Random(seed)
+    small = Image.new('RGB', (width // 8, height // 8))
+    small.putdata([
+        (
+            (x * 255 // (width // 8) + rng.randint(-40, 40)) % 256,
+            (y * 255 // (height // 8) + rng.randint(-40, 40)) % 256,
+            rng.randint(0, 255)
+        )
+        for y in range(height // 8) for x in range(width // 8)
+    ])
+    image = small.resize((width, height), Image.BICUBIC)
+    noise = Image.effect_noise((width, height), 24).convert('RGB')
+    return Image.blend(image, noise, 0.25)
+
+
+def _encode(image: Image.Image, fmt: str, **kwargs) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+def make_samples():
+    """(label, bytes) pairs"""
+    photo = _photo(4032, 3024, 1)
+
+    rotated = photo.copy()
+    exif = rotated.getexif()
+    exif[0x0112] = 6  # Rotate 90 CW on display
+
+    return [
+        ('jpeg 4032x3024', _encode(photo, 'JPEG', quality=95)),
+        ('jpeg rotated', _encode(rotated, 'JPEG', quality=95, exif=exif)),
+        ('png 1170x2532', _encode(_photo(1170, 2532, 2), 'PNG')),
+        ('jpeg 1024x768', _encode(_photo(1024, 768, 3), 'JPEG', quality=85)),
+    ]
+
+
+def _upload_ms(size: int, uplink_mbps: float) -> float:
+    wire = 4 * math.ceil(size / 3)  # base64
+    return wire * 8 / (uplink_mbps * 1_000_000) * 1000
+
+
+def run(max_edge: int, quality: int, uplink_mbps: float):
+    preprocessor = ImagePreprocessor(max_edge=max_edge, quality=quality)
+
+    print(f"max_edge {max_edge}, quality {quality}, uplink {uplink_mbps} Mbit/s\n")
+    print(f"{'image':>16} {'before':>10} {'after':>10} {'prep ms':>8} {'upload ms':>20}")
+
+    for label, data in make_samples():
+        before = preprocessor.preprocess_sec
+        prepared = preprocessor.prepare(data)
+        prep_ms = (preprocessor.preprocess_sec - before) * 1000
+
+        upload_before = _upload_ms(len(data), uplink_mbps)
+        upload_after = _upload_ms(len(prepared.data), uplink_mbps)
+        print(f"{label:>16} {len(data) / 1024:8.0f}KB {len(prepared.data) / 1024:8.0f}KB"
+              f" {prep_ms:8.1f} {upload_before:9.0f} -> {upload_after + prep_ms:7.0f}")
+
+    print()
+    print(preprocessor.stats())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-edge', type=int, default=1536)
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--uplink-mbps', type=float, default=20)
+    args = parser.parse_args()
+    run(args.max_edge, args.quality, args.uplink_mbps)
@@ -0,0 +1,231 @@
+"""
+End-to-end load benchmark for the AI service endpoints
+
+Drives each endpoint in turn with --requests requests at --concurrency
+and reports p50/p95/p99 latency, errors and throughput per endpoint.
+
+By default runs in-process and offline: the app is served through
+httpx's ASGI transport with the LocalModel stand-in as the model
+backend (latency/error rate set by the flags below). With --url it
+drives a running service instead, using whatever backend that service
+has. catalog_put replaces the service's exercise catalog, so it only
+runs when listed in --endpoints; against --url it sends
+FITAI_ADMIN_TOKEN from the environment.
+
+Requires httpx; Pillow for real JPEG uploads. Usage:
+    python -m benchmarks.load [--endpoints chat,generate_plan] [--requests 200]
+        [--concurrency 20] [--p50-ms 800] [--p95-ms 2500] [--error-rate 0]
+        [--url http://localhost:8001] [--json results.json]
+"""
+
+import io
+import os
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.synthetic import make_catalog, make_profile
+
+DEFAULT_ENDPOINTS = [
+    'health', 'catalog_get', 'generate_plan', 'adjust_plan', 'generate_plans_batch',
+    'chat', 'chat_stream', 'summarize', 'analyze_food', 'analyze_food_batch', 'analyze_body',
+]
+
+
+def _image() -> bytes:
+    """A small photo-like JPEG, or placeholder bytes without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b'\xff\xd8\xff' + bytes(64 * 1024)
+
+    image = Image.effect_noise((1600, 1200), 40).convert('RGB')
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+
+def _scenarios(catalog: List[Dict[str, Any]]) -> Dict[str, Callable[[int], Dict[str, Any]]]:
+    """Request builders by endpoint name; each takes the request number"""
+    profile = make_profile('muscle_gain', 'intermediate', 4)
+    image = _image()
+    history = [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'Câu hỏi/trả lời số {i} về lịch tập'}
+        for i in range(20)
+    ]
+
+    def plan(i):
+        return {'user_id': i, 'week_start': '2026-01-05', 'profile': profile, 'exercises': catalog}
+
+    return {
+        'health': lambda i: {'method': 'GET', 'url': '/health'},
+        'catalog_get': lambda i: {'method': 'GET', 'url': '/catalog'},
+        'catalog_put': lambda i: {'method': 'PUT', 'url': '/catalog', 'json': {'exercises': catalog},
+                                  'headers': {'X-Admin-Token': os.environ.get('FITAI_ADMIN_TOKEN', '')}},
+        'generate_plan': lambda i: {'method': 'POST', 'url': '/generate_plan', 'json': plan(i)},
+        'adjust_plan': lambda i: {'method': 'POST', 'url': '/adjust_plan', 'json': {
+            **plan(i),
+            'previous_plan': {'week_start': '2025-12-29', 'days': [
+                {'date': '2025-12-29', 'title': 'Push', 'status': 'done', 'fatigue_rating': 3}
+            ]},
+            'logs_summary': {'completed_days': 3, 'total_days': 4, 'completion_rate': 75,
+                             'average_fatigue': 3.0}
+        }},
+        'generate_plans_batch': lambda i: {'method': 'POST', 'url': '/generate_plans_batch', 'json': {
+            'entries': [
+                {'user_id': i * 20 + j, 'week_start': '2026-01-05', 'profile': profile}
+                for j in range(20)
+            ],
+            'exercises': catalog
+        }},
+        'chat': lambda i: {'method': 'POST', 'url': '/chat', 'json': {
+            'message': 'Tôi nên tập ngực mấy buổi một tuần?',
+            'conversation_id': 1_000_000 + i,
+            'conversation_history': history
+        }},
+        'chat_stream': lambda i: {'method': 'POST', 'url': '/chat/stream', 'json': {
+            'message': 'Tôi nên ăn gì sau khi tập?',
+            'conversation_id': 2_000_000 + i,
+            'conversation_history': history
+        }},
+        'summarize': lambda i: {'method': 'POST', 'url': '/summarize', 'json': {
+            'messages': history, 'previous_summary': 'Người dùng đang tập tăng cơ.'
+        }},
+        'analyze_food': lambda i: {'method': 'POST', 'url': '/analyze_food',
+                                   'files': {'image': ('meal.jpg', image, 'image/jpeg')}},
+        'analyze_food_batch': lambda i: {'method': 'POST', 'url': '/analyze_food_batch', 'files': [
+            ('images', (f'meal{j}.jpg', image, 'image/jpeg')) for j in range(3)
+        ]},
+        'analyze_body': lambda i: {'method': 'POST', 'url': '/analyze_body',
+                                   'files': {'image': ('body.jpg', image, 'image/jpeg')}},
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _succeeded(response: httpx.Response) -> bool:
+    """HTTP success that also isn't a reported failure in the body"""
+    if response.status_code >= 400:
+        return False
+
+    content_type = response.headers.get('content-type', '')
+    if content_type.startswith('application/json'):
+        body = response.json()
+        return not (isinstance(body, dict) and body.get('success') is False)
+    if content_type.startswith('text/event-stream'):
+        return '"success": false' not in response.text
+    if content_type.startswith('application/x-ndjson'):
+        return all('error' not in json.loads(line) for line in response.text.splitlines() if line)
+    return True
+
+
+async def _drive(client: httpx.AsyncClient, build, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = _succeeded(await client.request(**build(i)))
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(latencies[-1], 1) if latencies else 0.0,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def _local_app(p50_ms: float, p95_ms: float, error_rate: float):
+    """The service app with the LocalModel stand-in as backend"""
+    os.environ['FITAI_MODEL_BACKEND'] = 'local'
+    os.environ.setdefault('FITAI_ADMIN_TOKEN', 'bench')
+    import main
+    from local_model import LocalModel
+
+    model = LocalModel(latency_ms={'p50': p50_ms, 'p95': p95_ms}, error_rate=error_rate, seed=0)
+    main.gemini_client.model = model
+    main.chat_handler.model = model
+    return main.app
+
+
+async def run(args) -> Dict[str, Any]:
+    endpoints = args.endpoints.split(',') if args.endpoints else DEFAULT_ENDPOINTS
+    scenarios = _scenarios(make_catalog(args.catalog_size))
+    unknown = [name for name in endpoints if name not in scenarios]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        transport = httpx.ASGITransport(app=_local_app(args.p50_ms, args.p95_ms, args.error_rate))
+        client = httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None)
+
+    results = {}
+    async with client:
+        print(f"{'endpoint':>22} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9}"
+              f" {'p99 ms':>9} {'max ms':>9} {'req/s':>8}")
+        for name in endpoints:
+            result = await _drive(client, scenarios[name], args.requests, args.concurrency)
+            results[name] = result
+            print(f"{name:>22} {result['requests']:6d} {result['errors']:6d} {result['p50_ms']:9.1f}"
+                  f" {result['p95_ms']:9.1f} {result['p99_ms']:9.1f} {result['max_ms']:9.1f}"
+                  f" {result['rps']:8.1f}")
+
+    return {
+        'config': {
+            'url': args.url,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'model_p50_ms': args.p50_ms,
+            'model_p95_ms': args.p95_ms,
+            'model_error_rate': args.error_rate,
+            'catalog_size': args.catalog_size
+        },
+        'endpoints': results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoints', help=f"comma-separated; default: {','.join(DEFAULT_ENDPOINTS)}")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--p50-ms', type=float, default=800)
+    parser.add_argument('--p95-ms', type=float, default=2500)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--catalog-size', type=int, default=200)
+    parser.add_argument('--url', help='drive a running service instead of the in-process app')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    output = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
@@ -0,0 +1,76 @@
+"""
+Cost of the /metrics instrumentation
+
+Times Counter.inc and Histogram.observe, the MetricsMiddleware wrapped
+around a no-op ASGI app against the bare app, and rendering the
+registry. Each figure is the per-call cost in microseconds.
+Usage:
+    python -m benchmarks.metrics_overhead [--calls 200000]
+"""
+
+import time
+import asyncio
+import argparse
+
+from metrics import Counter, Histogram, Registry, MetricsMiddleware
+
+
+class _App:
+    routes = [type('Route', (), {'path': '/generate_plan'})()]
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+async def _receive():
+    return {'type': 'http.request', 'body': b''}
+
+
+async def _send(message):
+    pass
+
+
+def _per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+async def _per_request_us(app, calls: int) -> float:
+    scope = {'type': 'http', 'method': 'POST', 'path': '/generate_plan', 'app': _App(), 'headers': []}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await app(scope, _receive, _send)
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def run(calls: int):
+    counter = Counter('bench_total', 'bench', ('path', 'method', 'status'))
+    histogram = Histogram('bench_seconds', 'bench', ('path', 'method'))
+
+    inc = _per_call_us(lambda: counter.inc(path='/generate_plan', method='POST', status='200'), calls)
+    observe = _per_call_us(lambda: histogram.observe(0.042, path='/generate_plan', method='POST'), calls)
+    print(f"Counter.inc          {inc:8.3f} us")
+    print(f"Histogram.observe    {observe:8.3f} us")
+
+    bare = asyncio.run(_per_request_us(_App(), calls))
+    wrapped = asyncio.run(_per_request_us(MetricsMiddleware(_App()), calls))
+    print(f"request, bare app    {bare:8.3f} us")
+    print(f"request, middleware  {wrapped:8.3f} us  (+{wrapped - bare:.3f} us per request)")
+
+    registry = Registry()
+    for metric in (counter, histogram):
+        registry.register(metric)
+    for i in range(50):
+        counter.inc(path=f'/endpoint{i}', method='POST', status='200')
+        histogram.observe(0.1, path=f'/endpoint{i}', method='POST')
+    render = _per_call_us(registry.render, max(1, calls // 1000))
+    print(f"render (51 series)   {render:8.1f} us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200000)
+    run(parser.parse_args().calls)
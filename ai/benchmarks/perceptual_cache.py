@@ -0,0 +1,77 @@
+"""
+Lookup speed of the perceptual food-image cache
+
+Fills a PerceptualCache with --size random 64-bit hashes and times
+exact, near (1..max_distance flipped bits) and missing lookups against
+a linear Hamming scan of the same entries, checking both agree.
+
+Usage:
+    python -m benchmarks.perceptual_cache [--size 200000] [--max-distance 4] [--queries 2000]
+"""
+
+import time
+import random
+import argparse
+
+from image_cache import PerceptualCache, hamming
+
+
+def _flip(value: int, bits: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def _linear(keys, query: int, max_distance: int):
+    best = None
+    for key in keys:
+        distance = hamming(key, query)
+        if distance <= max_distance and (best is None or distance < best):
+            best = distance
+    return best
+
+
+def run(size: int, max_distance: int, queries: int):
+    rng = random.Random(0)
+    cache = PerceptualCache(max_size=size, max_distance=max_distance)
+    keys = [rng.getrandbits(64) for _ in range(size)]
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, key)
+    print(f"fill {size} entries: {time.perf_counter() - start:.2f}s")
+
+    kinds = {
+        'exact': [rng.choice(keys) for _ in range(queries)],
+        'near': [_flip(rng.choice(keys), rng.randint(1, max_distance), rng) for _ in range(queries)],
+        'miss': [rng.getrandbits(64) for _ in range(queries)],
+    }
+
+    for kind, batch in kinds.items():
+        start = time.perf_counter()
+        found = [cache.get(query) for query in batch]
+        elapsed = time.perf_counter() - start
+        hits = sum(result is not None for result in found)
+        print(f"{kind:>6}: {elapsed / len(batch) * 1e6:8.1f} us/lookup  hits {hits}/{len(batch)}")
+
+    # Linear scan on a sample, checking distances agree
+    sample = kinds['near'][:20] + kinds['miss'][:20]
+    start = time.perf_counter()
+    expected = [_linear(keys, query, max_distance) for query in sample]
+    linear_us = (time.perf_counter() - start) / len(sample) * 1e6
+    actual = [cache.get(query) for query in sample]
+    agree = all(
+        (result is None and distance is None) or (result is not None and result[1] == distance)
+        for result, distance in zip(actual, expected)
+    )
+    print(f"linear: {linear_us:8.1f} us/lookup  agrees with index: {agree}")
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--max-distance', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.size, args.max_distance, args.queries)
@@ -0,0 +1,140 @@
+"""
+Per-request CPU of plan response handling, before and after the fast path
+
+Times what happens to a generated plan on its way out of /generate_plan:
+- model: PlanResponse(**plan) in the endpoint, then FastAPI's
+  response_model check and JSON encoding (the previous path)
+- fast: plan_json_response() on the plan dict (orjson when installed)
+- fast, pydantic_core: the same without orjson
+
+Then drives /generate_plan end to end through the ASGI app (catalog
+request, Mode A, plan cache off so every request generates) with the
+route returning either way, reporting CPU time per request (client
+included, so the saving shows as a smaller share there). Responses
+of both paths are checked to be byte-identical.
+Usage:
+    python -m benchmarks.plan_response [--requests 2000] [--catalog-size 2000] [--rounds 5]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+from typing import Callable
+
+os.environ['FITAI_PLAN_CACHE_MB'] = '0'
+
+import httpx
+
+import main
+import responses
+from catalog import ExerciseCatalog
+from benchmarks.synthetic import make_catalog, make_profile, GOALS, LEVELS, DAYS_PER_WEEK
+
+
+def _cpu_us(func: Callable, calls: int) -> float:
+    start = time.process_time()
+    for _ in range(calls):
+        func()
+    return (time.process_time() - start) * 1e6 / calls
+
+
+def _model_path(plan, field):
+    """PlanResponse in the endpoint, then FastAPI's response_model handling"""
+    value, _ = field.validate(main.PlanResponse(**plan), {}, loc=('response',))
+    return field.serialize_json(value)
+
+
+def _fast_path_pydantic_core(plan):
+    available = responses.ORJSON_AVAILABLE
+    responses.ORJSON_AVAILABLE = False
+    try:
+        return responses.plan_json_response(plan).body
+    finally:
+        responses.ORJSON_AVAILABLE = available
+
+
+async def _end_to_end(bodies, validate: bool) -> float:
+    """CPU microseconds per /generate_plan request"""
+    original = main._plan_response
+    if validate:
+        # The previous endpoint: return the model, let FastAPI serialize it
+        main._plan_response = lambda plan: main.PlanResponse(**plan)
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for body in bodies[:50]:
+                await client.post('/generate_plan', json=body)
+            start = time.process_time()
+            for body in bodies:
+                response = await client.post('/generate_plan', json=body)
+                response.raise_for_status()
+            return (time.process_time() - start) * 1e6 / len(bodies)
+    finally:
+        main._plan_response = original
+
+
+async def _responses(bodies, validate: bool):
+    original = main._plan_response
+    if validate:
+        main._plan_response = lambda plan: main.PlanResponse(**plan)
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            return [(await client.post('/generate_plan', json=body)).content for body in bodies]
+    finally:
+        main._plan_response = original
+
+
+def run(requests: int, catalog_size: int, rounds: int):
+    main.gemini_client.model = None
+    catalog = ExerciseCatalog(make_catalog(catalog_size))
+    main.catalog_registry.current = catalog
+
+    combos = [(g, l, d) for g in GOALS for l in LEVELS for d in DAYS_PER_WEEK]
+    bodies = [
+        {
+            'user_id': i,
+            'week_start': '2026-01-05',
+            'profile': make_profile(*combos[i % len(combos)]),
+            'catalog_version': catalog.version
+        }
+        for i in range(requests)
+    ]
+
+    before = asyncio.run(_responses(bodies[:200], validate=True))
+    after = asyncio.run(_responses(bodies[:200], validate=False))
+    assert before == after, "fast path output differs from response_model serialization"
+
+    route = next(r for r in main.app.routes if getattr(r, 'path', None) == '/generate_plan')
+    plan = main.generator.generate_plan(make_profile('muscle_gain', 'advanced', 6), catalog.index, '2026-01-05', 7)
+    sessions = sum(len(day['sessions']) for day in plan['days'])
+    calls = max(1, requests * 5)
+    assert _fast_path_pydantic_core(plan) == responses.plan_json_response(plan).body
+
+    print(f"6-day plan, {sessions} sessions, orjson {'installed' if responses.ORJSON_AVAILABLE else 'missing'}")
+    print("response handling (CPU us per plan):")
+    model = _cpu_us(lambda: _model_path(plan, route.response_field), calls)
+    fast = _cpu_us(lambda: responses.plan_json_response(plan), calls)
+    fallback = _cpu_us(lambda: _fast_path_pydantic_core(plan), calls)
+    print(f"  model + response_model   {model:8.1f}")
+    print(f"  fast                     {fast:8.1f}  ({model / fast:.1f}x)")
+    print(f"  fast, pydantic_core      {fallback:8.1f}  ({model / fallback:.1f}x)")
+
+    print(f"\n/generate_plan end to end, {requests} requests (CPU us per request, best of {rounds}):")
+    # Alternate the two so drift (GC, caches) affects both alike
+    old = new = float('inf')
+    for _ in range(rounds):
+        old = min(old, asyncio.run(_end_to_end(bodies, validate=True)))
+        new = min(new, asyncio.run(_end_to_end(bodies, validate=False)))
+    print(f"  before                   {old:8.1f}")
+    print(f"  after                    {new:8.1f}  ({(new - old) / old:+.0%})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--catalog-size', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    run(args.requests, args.catalog_size, args.rounds)
@@ -0,0 +1,140 @@
+"""
+Cold start: import time and time to /health and /ready
+
+Runs `python -X importtime -c "import main"` in fresh processes and
+reports the total import time (best of --runs) with the slowest
+modules it imports, then starts the service under uvicorn and times how
+long /health and /ready take to answer 200. With --max-import-ms the
+exit status is 1 when the import exceeds the budget, so CI can catch a
+heavy module-level import (an SDK, Pillow) creeping back in.
+Usage:
+    python -m benchmarks.startup [--runs 5] [--top 10] [--max-import-ms 800]
+        [--no-server] [--port 8766] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> Dict[str, str]:
+    # The local stand-in keeps the server side independent of API keys
+    return {**os.environ, 'FITAI_MODEL_BACKEND': os.environ.get('FITAI_MODEL_BACKEND', 'local')}
+
+
+def _import_profile() -> Tuple[float, List[Tuple[str, float]]]:
+    """Total import time of main and cumulative time per module main imports, in ms"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=AI_DIR, env=_env(), capture_output=True, text=True, check=True
+    )
+    entries: List[Tuple[int, str, float]] = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nested two spaces deeper
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1000))
+
+    # Children are listed before their parent
+    position = next(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == 'main')
+    direct: List[Tuple[str, float]] = []
+    for depth, name, ms in reversed(entries[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            direct.append((name, ms))
+    return entries[position][2], direct
+
+
+def _wait_200(url: str, server: subprocess.Popen, start: float, timeout: float = 60) -> Optional[float]:
+    """Seconds from start until url answers 200, or None"""
+    while time.perf_counter() - start < timeout:
+        if server.poll() is not None:
+            return None
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def _server_startup(port: int) -> Dict[str, Optional[float]]:
+    """Time from process start to /health and /ready answering 200, in ms"""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port)],
+        cwd=AI_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f'http://127.0.0.1:{port}'
+        health = _wait_200(f'{base}/health', server, start)
+        ready = _wait_200(f'{base}/ready', server, start)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    def ms(seconds):
+        return round(seconds * 1000, 1) if seconds is not None else None
+
+    return {'health_ms': ms(health), 'ready_ms': ms(ready)}
+
+
+def run(args) -> Dict[str, Any]:
+    profiles = [_import_profile() for _ in range(args.runs)]
+    total, imports = min(profiles, key=lambda profile: profile[0])
+    slowest = sorted(imports, key=lambda item: -item[1])
+
+    print(f"import main: {total:.1f} ms (best of {args.runs}, "
+          f"worst {max(profile[0] for profile in profiles):.1f} ms)")
+    print("\nslowest imports of main:")
+    for name, ms in slowest[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    results: Dict[str, Any] = {
+        'import_ms': round(total, 1),
+        'top_imports': [{'module': name, 'ms': round(ms, 1)} for name, ms in slowest[:args.top]]
+    }
+
+    if not args.no_server:
+        server = _server_startup(args.port)
+        results.update(server)
+        print(f"\nprocess start to /health 200: {server['health_ms']} ms")
+        print(f"process start to /ready 200:  {server['ready_ms']} ms")
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-import-ms', type=float, help='fail when import main takes longer')
+    parser.add_argument('--no-server', action='store_true', help='skip the /health and /ready timing')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_import_ms is not None and results['import_ms'] > args.max_import_ms:
+        print(f"\n✗ import main took {results['import_ms']} ms, budget {args.max_import_ms:g} ms")
+        sys.exit(1)
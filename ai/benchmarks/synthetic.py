@@ -0,0 +1,48 @@
+"""
+Synthetic exercise catalogs for benchmarks
+
+Spreads exercises evenly across every muscle group, equipment tier
+and difficulty tier the generator knows about.
+"""
+
+import random
+from typing import List, Dict, Any
+
+MUSCLE_GROUPS = ['chest', 'back', 'shoulders', 'biceps', 'triceps', 'legs', 'core']
+EQUIPMENT = ['none', 'home', 'gym']
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+
+GOALS = ['fat_loss', 'muscle_gain', 'maintenance']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+DAYS_PER_WEEK = [3, 4, 5, 6]
+
+
+def make_catalog(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build a catalog of size exercises with unique names"""
+    rng = random.Random(seed)
+    catalog = []
+
+    for i in range(size):
+        muscle = MUSCLE_GROUPS[i % len(MUSCLE_GROUPS)]
+        catalog.append({
+            'name': f"{muscle.title()} exercise {i}",
+            'muscle_group': muscle,
+            'equipment': rng.choice(EQUIPMENT),
+            'difficulty': rng.choice(DIFFICULTIES),
+            'description': f"Synthetic {muscle} exercise"
+        })
+
+    return catalog
+
+
+def make_profile(goal: str, level: str, days_per_week: int) -> Dict[str, Any]:
+    """Build a profile for one goal/level/days combination"""
+    return {
+        'goal': goal,
+        'level': level,
+        'days_per_week': days_per_week,
+        'session_minutes': 60,
+        'equipment': 'gym',
+        'constraints': None,
+        'availability': None
+    }
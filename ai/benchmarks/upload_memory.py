@@ -0,0 +1,99 @@
+"""
+Peak Python heap per image upload under concurrency
+
+Sends --concurrency simultaneous /analyze_food uploads of a synthetic
+phone photo (chat model stubbed) and reports the tracemalloc peak per
+request, as a multiple of the upload size. For comparison, the same run
+against a route that handles the upload the old way: image.read() then
+base64-encode the full bytes.
+
+tracemalloc sees Python-heap copies of the upload; Pillow's decoded
+pixel buffers are allocated outside it. Requires httpx and Pillow.
+Usage:
+    python -m benchmarks.upload_memory [--concurrency 8] [--no-preprocess]
+"""
+
+import base64
+import asyncio
+import argparse
+import tracemalloc
+
+import httpx
+from fastapi import File, UploadFile
+
+import main
+from benchmarks.image_preprocessing import make_samples
+
+BOUNDARY = 'fitai-bench'
+CHUNK = 64 * 1024  # about what an ASGI server hands over per receive()
+
+
+class _StubModel:
+    def generate_content(self, parts):
+        return type('Response', (), {'text': '{"foods": [], "total_calories": 0}'})()
+
+
+@main.app.post('/_bench/analyze_food_read_all')
+async def _analyze_food_read_all(image: UploadFile = File(...)):
+    """The handler before bounded uploads: full read plus base64 copy"""
+    image_data = await image.read()
+    image_part = {'mime_type': 'image/jpeg', 'data': base64.b64encode(image_data).decode()}
+    main.chat_handler.model.generate_content(['prompt', image_part])
+    return {'success': True}
+
+
+def _multipart(data: bytes):
+    head = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="meal.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode()
+    body = head + data + f'\r\n--{BOUNDARY}--\r\n'.encode()
+    return [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+
+
+async def _measure(path: str, chunks, concurrency: int) -> int:
+    async def content():
+        for chunk in chunks:
+            yield chunk
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        headers = {'content-type': f'multipart/form-data; boundary={BOUNDARY}'}
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        responses = await asyncio.gather(*[
+            client.post(path, content=content(), headers=headers)
+            for _ in range(concurrency)
+        ])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    for response in responses:
+        response.raise_for_status()
+    return peak
+
+
+def run(concurrency: int, preprocess: bool):
+    main.chat_handler.model = _StubModel()
+    main.chat_handler.image_preprocessor.enabled = preprocess
+    main.chat_handler.food_cache.get = lambda key: None  # every upload is a miss
+
+    data = dict(make_samples())['jpeg 4032x3024']
+    chunks = _multipart(data)
+    size_mb = len(data) / (1024 * 1024)
+    print(f"upload {size_mb:.1f} MB x {concurrency} concurrent, preprocessing {'on' if preprocess else 'off'}\n")
+
+    for label, path in (('read all', '/_bench/analyze_food_read_all'), ('bounded', '/analyze_food')):
+        peak = asyncio.run(_measure(path, chunks, concurrency))
+        per_request = peak / concurrency / (1024 * 1024)
+        print(f"{label:>9}: peak {peak / (1024 * 1024):7.1f} MB  "
+              f"per request {per_request:6.1f} MB ({per_request / size_mb:.2f}x upload)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-preprocess', action='store_true')
+    args = parser.parse_args()
+    run(args.concurrency, not args.no_preprocess)
@@ -0,0 +1,213 @@
+"""
+Memory per worker and throughput scaling under serve.py
+
+For each worker count, starts `python serve.py` twice, once with the
+shared memory-mapped catalog and once with --no-shared-catalog (every
+worker parses and indexes its own copy). It reports:
+- memory of the worker processes from /proc/<pid>/smaps_rollup: PSS
+  (shared pages split between the processes mapping them) and USS
+  (pages private to a worker)
+- growth per extra worker
+- /generate_plan throughput with catalog_version
+
+Uses a synthetic catalog and the LocalModel backend, with enhancement
+caches warmed first, so the rule engine dominates. Throughput can only
+scale up to the cores available (reported). Linux only; requires httpx.
+Usage:
+    python -m benchmarks.workers [--workers 1,2,4] [--catalog-size 50000]
+        [--duration 10] [--concurrency 16] [--port 8765]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+import httpx
+
+from catalog import ExerciseCatalog
+from benchmarks.synthetic import make_catalog, make_profile
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode(errors='replace')
+    except OSError:
+        return ''
+
+
+def _workers(server_pid: int, count: int) -> List[int]:
+    """Worker pids: the server itself with one worker, else its children"""
+    if count == 1:
+        return [server_pid]
+    return [pid for pid in _children(server_pid) if 'resource_tracker' not in _cmdline(pid)]
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    }
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, workers: int):
+    """Health check passes, all workers exist and their memory has settled"""
+    deadline = time.monotonic() + 180
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError("serve.py exited during startup")
+        if time.monotonic() > deadline:
+            raise RuntimeError("serve.py did not become ready")
+        try:
+            if (await client.get('/health')).status_code == 200:
+                break
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+
+    previous = -1
+    while time.monotonic() < deadline:
+        pids = _workers(server.pid, workers)
+        total = sum(_memory_kb(pid)['rss'] for pid in pids) if len(pids) == workers else -1
+        if total > 0 and abs(total - previous) <= total * 0.01:
+            return
+        previous = total
+        await asyncio.sleep(1.0)
+
+
+async def _throughput(client: httpx.AsyncClient, version: str, duration: float,
+                      concurrency: int, warmup: int) -> float:
+    profile = make_profile('muscle_gain', 'intermediate', 4)
+
+    def body(i):
+        return {'user_id': i, 'week_start': '2026-01-05', 'profile': profile, 'catalog_version': version}
+
+    # Fill every worker's enhancement cache before timing
+    for start in range(0, warmup, concurrency):
+        await asyncio.gather(*[
+            client.post('/generate_plan', json=body(i)) for i in range(start, min(start + concurrency, warmup))
+        ])
+
+    completed = 0
+    stop = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal completed
+        i = offset
+        while time.perf_counter() < stop:
+            response = await client.post('/generate_plan', json=body(i))
+            response.raise_for_status()
+            completed += 1
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(n) for n in range(concurrency)])
+    return completed / (time.perf_counter() - start)
+
+
+async def _measure(workers: int, shared: bool, args, version: str, env: Dict[str, str]) -> Dict[str, Any]:
+    command = [sys.executable, 'serve.py', '--workers', str(workers),
+               '--host', '127.0.0.1', '--port', str(args.port)]
+    if not shared:
+        command.append('--no-shared-catalog')
+
+    server = subprocess.Popen(command, cwd=AI_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{args.port}', timeout=None) as client:
+            await _wait_ready(client, server, workers)
+            memory = [_memory_kb(pid) for pid in _workers(server.pid, workers)]
+            rps = await _throughput(client, version, args.duration, args.concurrency, 20 * workers)
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    return {
+        'workers': workers,
+        'shared': shared,
+        'pss_mb': round(sum(m['pss'] for m in memory) / 1024, 1),
+        'uss_mb': round(sum(m['uss'] for m in memory) / 1024, 1),
+        'rss_mb': round(sum(m['rss'] for m in memory) / 1024, 1),
+        'rps': round(rps, 1)
+    }
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    counts = [int(n) for n in args.workers.split(',')]
+    catalog = make_catalog(args.catalog_size)
+    version = ExerciseCatalog.compute_version(catalog)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, 'exercise_catalog.json')
+        with open(catalog_path, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False)
+        env = {
+            **os.environ,
+            'FITAI_CATALOG_PATH': catalog_path,
+            'FITAI_SHARED_CATALOG_DIR': tmp,
+            'FITAI_MODEL_BACKEND': 'local'
+        }
+
+        print(f"catalog {args.catalog_size} exercises, {os.cpu_count()} CPUs, "
+              f"{args.concurrency} concurrent clients for {args.duration:g}s\n")
+        print(f"{'catalog':>8} {'workers':>7} {'PSS MB':>8} {'USS MB':>8} {'RSS MB':>8}"
+              f" {'+PSS/worker':>11} {'req/s':>8} {'speedup':>7}")
+        for shared in (False, True):
+            base = None
+            for workers in counts:
+                result = await _measure(workers, shared, args, version, env)
+                if base is None:
+                    base = result
+                growth = ((result['pss_mb'] - base['pss_mb']) / (workers - base['workers'])
+                          if workers != base['workers'] else 0.0)
+                result['pss_growth_per_worker_mb'] = round(growth, 1)
+                result['speedup'] = round(result['rps'] / base['rps'], 2) if base['rps'] else 0.0
+                results.append(result)
+                print(f"{'shared' if shared else 'copies':>8} {workers:7d} {result['pss_mb']:8.1f}"
+                      f" {result['uss_mb']:8.1f} {result['rss_mb']:8.1f} {growth:11.1f}"
+                      f" {result['rps']:8.1f} {result['speedup']:7.2f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--catalog-size', type=int, default=50000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
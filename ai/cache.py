@@ -0,0 +1,98 @@
+"""
+FitAI - In-process caches
+
+Small thread-safe LRU cache with optional TTL, used to memoize
+Gemini responses and other repeatable work.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Size-bounded LRU cache with optional per-entry TTL
+
+    With max_bytes, entries are also evicted to keep the total of
+    len(value) under it (values must then be bytes or str).
+    Tracks hits, misses and evictions for monitoring.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_sec: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_size = max(1, int(max_size))
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting least recently used entries if full"""
+        expires_at = time.monotonic() + self.ttl_sec if self.ttl_sec else None
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at)
+            if self.max_bytes is not None:
+                self.bytes += len(value)
+
+            while len(self._data) > self.max_size or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        value, _ = self._data.pop(key)
+        if self.max_bytes is not None:
+            self.bytes -= len(value)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        stats = {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'ttl_sec': self.ttl_sec,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+        if self.max_bytes is not None:
+            stats['bytes'] = self.bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
@@ -0,0 +1,147 @@
+"""
+FitAI - Exercise Catalog Registry
+
+Holds the exercise catalog server-side so plan requests can send a
+short catalog_version hash instead of the full exercises table.
+
+The catalog is loaded from disk at startup and replaced via upload;
+each upload is persisted so restarts keep the latest version. Under
+serve.py the workers instead map the shared encoding written by the
+parent (FITAI_SHARED_CATALOG).
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+
+from generator import ExerciseIndex
+from shared_catalog import MappedExerciseIndex
+
+
+def default_catalog_path() -> str:
+    """FITAI_CATALOG_PATH or ai/exercise_catalog.json"""
+    return os.environ.get('FITAI_CATALOG_PATH') or os.path.join(
+        os.path.dirname(__file__), 'exercise_catalog.json'
+    )
+
+
+class ExerciseCatalog:
+    """Immutable, content-hashed list of exercises with its lookup index"""
+
+    def __init__(
+        self,
+        exercises: Optional[List[Dict[str, Any]]],
+        version: Optional[str] = None,
+        index: Optional[ExerciseIndex] = None
+    ):
+        # A prebuilt index (e.g. a MappedExerciseIndex) comes with its version
+        self.index = index if index is not None else ExerciseIndex(exercises)
+        self.version = version or self.compute_version(self.index.exercises)
+
+    @property
+    def exercises(self) -> List[Dict[str, Any]]:
+        return self.index.exercises
+
+    @staticmethod
+    def compute_version(exercises: List[Dict[str, Any]]) -> str:
+        """
+        Hash catalog content
+
+        Exercise order is part of the hash because the generator's
+        selection depends on it.
+        """
+        payload = json.dumps(
+            exercises,
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class CatalogRegistry:
+    """
+    Registry of the currently active exercise catalog
+
+    Catalog file location: FITAI_CATALOG_PATH or ai/exercise_catalog.json
+
+    With several workers, an upload reaches only one of them; the others
+    reload the persisted file when asked for a version they don't have
+    and the file has changed since they loaded it.
+    """
+
+    def __init__(self, path: Optional[str] = None, shared_path: Optional[str] = None):
+        self.path = path or default_catalog_path()
+        self.shared_path = shared_path or os.environ.get('FITAI_SHARED_CATALOG')
+        self._lock = threading.Lock()
+        self.current: Optional[ExerciseCatalog] = None
+        self._mtime: Optional[float] = None
+        self._load()
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _load(self):
+        """Map the shared catalog, or load the persisted one, if any"""
+        self._mtime = self._file_mtime()
+        try:
+            if self.shared_path and os.path.exists(self.shared_path):
+                index = MappedExerciseIndex(self.shared_path)
+                self.current = ExerciseCatalog(None, version=index.version, index=index)
+                print(f"✓ Mapped shared exercise catalog {self.current.version} ({len(self.current)} exercises)")
+            elif self._mtime is not None:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.current = ExerciseCatalog(json.load(f))
+                print(f"✓ Loaded exercise catalog {self.current.version} ({len(self.current)} exercises)")
+        except Exception as e:
+            print(f"⚠ Error loading exercise catalog: {e}")
+
+    def get(self, version: str) -> Optional[ExerciseCatalog]:
+        """Return the current catalog if it matches version"""
+        current = self.current
+        if current is not None and current.version == version:
+            return current
+
+        # Another worker may have installed a newer catalog
+        mtime = self._file_mtime()
+        if mtime is not None and mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._mtime = mtime
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            self.current = ExerciseCatalog(json.load(f))
+                        print(f"✓ Reloaded exercise catalog {self.current.version}")
+                    except Exception as e:
+                        print(f"⚠ Error reloading exercise catalog: {e}")
+            current = self.current
+            if current is not None and current.version == version:
+                return current
+        return None
+
+    def replace(self, exercises: List[Dict[str, Any]]) -> ExerciseCatalog:
+        """Install a new catalog and persist it to disk"""
+        catalog = ExerciseCatalog(exercises)
+
+        with self._lock:
+            try:
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(exercises, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"⚠ Error saving exercise catalog: {e}")
+
+            self.current = catalog
+            self._mtime = self._file_mtime()
+
+        print(f"✓ Exercise catalog updated: {catalog.version} ({len(catalog)} exercises)")
+        return catalog
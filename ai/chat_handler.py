@@ -5,16 +5,15 @@ Handles AI chat, food calorie analysis, and body analysis using Gemini
 
 import os
 import json
-import base64
-from typing import Dict, Any, Optional, List
+import time
+import asyncio
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple, Union, BinaryIO
 
-try:
-    import google.generativeai as genai
-    from PIL import Image
-    import io
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
+from chat_sessions import ChatSessionPool, PooledSession, SessionNotFound
+from context_window import TokenCounter, PromptTokenStats, select_window
+from image_preprocessing import ImagePreprocessor
+from image_cache import PerceptualCache, low_detail
+from metrics import CHAT_PROMPT_TOKENS
 
 
 class ChatHandler:
@@ -26,11 +25,55 @@ class ChatHandler:
     - Food image calorie analysis
     - Body image analysis with improvement suggestions
     - Conversation summarization
+    
+    Chat sessions are pooled per conversation_id, so clients only send
+    the new message; full history is needed only after eviction.
+    History is windowed by a token budget rather than a message count.
     """
     
+    UNAVAILABLE_MESSAGE = "Xin lỗi, PT AI đang không khả dụng. Vui lòng thử lại sau."
+    ERROR_MESSAGE = "Xin lỗi, có lỗi xảy ra. Vui lòng thử lại."
+    SUMMARY_UNAVAILABLE = "Tóm tắt cuộc trò chuyện không khả dụng."
+    SUMMARY_ERROR = "Không thể tạo tóm tắt."
+    
     def __init__(self, gemini_client):
         self.gemini_client = gemini_client
-        self.model = gemini_client.model if gemini_client else None
+        self._model = None  # set to override the client's model
+        
+        # Live chat sessions by conversation id (off under several workers)
+        pool_config = gemini_client.config.get('chat_sessions', {}) if gemini_client else {}
+        pool_enabled = os.environ.get('FITAI_CHAT_SESSION_POOL', '1').lower() not in ('0', 'false', 'no')
+        self.session_pool = ChatSessionPool(
+            max_sessions=pool_config.get('max_sessions', 1000),
+            max_bytes=pool_config.get('max_bytes', 64 * 1024 * 1024),
+            idle_ttl_sec=pool_config.get('idle_ttl_sec', 1800),
+            enabled=pool_enabled and pool_config.get('enabled', True)
+        )
+        
+        # Token-budgeted history
+        context_config = gemini_client.config.get('chat_context', {}) if gemini_client else {}
+        self.history_token_budget = context_config.get('history_token_budget', 2000)
+        self.token_counter_mode = context_config.get('token_counter', 'estimate')
+        # The model is bound on first use, once the client has built it
+        self.token_counter = TokenCounter(mode=self.token_counter_mode)
+        self.prompt_token_stats = PromptTokenStats()
+        
+        # Downscale/re-encode food and body photos before upload
+        image_config = gemini_client.config.get('image_preprocessing', {}) if gemini_client else {}
+        self.image_preprocessor = ImagePreprocessor(
+            enabled=image_config.get('enabled', True),
+            max_edge=image_config.get('max_edge', 1536),
+            quality=image_config.get('quality', 85),
+            workers=image_config.get('workers', 4)
+        )
+        
+        # Food analyses by perceptual hash of the preprocessed photo
+        food_cache_config = gemini_client.config.get('cache', {}).get('food_image', {}) if gemini_client else {}
+        self.food_cache = PerceptualCache(
+            max_size=food_cache_config.get('max_size', 50000),
+            max_distance=food_cache_config.get('max_distance', 4),
+            ttl_sec=food_cache_config.get('ttl_sec', 7 * 86400)
+        )
         
         # System prompts
         self.chat_system_prompt = """Bạn là PT AI - Huấn luyện viên cá nhân AI chuyên nghiệp. 
@@ -45,6 +88,8 @@ Quy tắc:
 - Đưa ra lời khuyên thực tế, an toàn
 - Khuyến khích người dùng kiên trì
 - Nếu câu hỏi về y tế nghiêm trọng, khuyên họ gặp bác sĩ"""
+        self.chat_system_ack = "Tôi hiểu. Tôi là PT AI, sẵn sàng tư vấn về tập luyện và dinh dưỡng."
+        self.summary_ack = "Tôi đã nắm được nội dung trước đó."
 
         self.food_analysis_prompt = """Bạn là chuyên gia dinh dưỡng AI. Phân tích ảnh thức ăn và ước tính:
 
@@ -93,14 +138,34 @@ Trả lời dạng JSON:
     "disclaimer": "Lưu ý về giới hạn của phân tích"
 }"""
 
+    @property
+    def model(self):
+        """The Gemini client's model (once initialized), unless overridden"""
+        model = self._model
+        if model is None and self.gemini_client:
+            model = self.gemini_client.model
+        if model is not None and self.token_counter_mode == 'model' and self.token_counter.model is None:
+            self.token_counter.model = model
+        return model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        if self.token_counter_mode == 'model':
+            self.token_counter.model = value
+    
     def is_available(self) -> bool:
         """Check if chat is available"""
+        if self._model is None and not (self.gemini_client and self.gemini_client.is_available()):
+            return False
         return self.model is not None
     
     async def chat(
         self,
         message: str,
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        conversation_id: Optional[int] = None,
+        summary: Optional[str] = None
     ) -> str:
         """
         Process a chat message and return AI response
@@ -108,46 +173,235 @@ Trả lời dạng JSON:
         Args:
             message: User message
             conversation_history: Previous messages for context
+            conversation_id: Reuse the pooled session for this conversation
+            summary: Stored conversation summary to prepend to the history
         
         Returns:
             AI response string
+        
+        Raises:
+            SessionNotFound: conversation_id has no live session and
+                conversation_history was not sent
         """
         if not self.is_available():
-            return "Xin lỗi, PT AI đang không khả dụng. Vui lòng thử lại sau."
+            return self.UNAVAILABLE_MESSAGE
+        
+        session = await self._open_session(conversation_id, conversation_history, summary)
         
         try:
-            # Build conversation context
-            messages = []
+            # Generate response (one turn at a time per conversation)
+            async with session.lock:
+                await self._prepare_turn(conversation_id, session, message)
+                response = await self.gemini_client.run('chat', session.chat.send_message, message)
+                await self._record_turn(conversation_id, session, message, response.text)
             
-            # Add system prompt
-            messages.append({"role": "user", "parts": [self.chat_system_prompt]})
-            messages.append({"role": "model", "parts": ["Tôi hiểu. Tôi là PT AI, sẵn sàng tư vấn về tập luyện và dinh dưỡng."]})
+            return response.text
             
-            # Add conversation history (last 10 messages for context)
-            if conversation_history:
-                for msg in conversation_history[-10:]:
-                    role = "user" if msg["role"] == "user" else "model"
-                    messages.append({"role": role, "parts": [msg["content"]]})
+        except Exception as e:
+            print(f"Chat error: {e}")
+            return self.ERROR_MESSAGE
+    
+    async def chat_stream(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        conversation_id: Optional[int] = None,
+        summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Process a chat message, yielding the AI response in chunks
+        
+        Uses the model's streaming mode. Errors (including
+        SessionNotFound) are raised to the caller so it can report them
+        after any chunks already sent. A turn cut short (client gone or
+        model error) evicts the pooled session, so the next turn starts
+        over from the history instead of a session whose turns and
+        token/byte accounting disagree.
+        """
+        if not self.is_available():
+            yield self.UNAVAILABLE_MESSAGE
+            return
+        
+        session = await self._open_session(conversation_id, conversation_history, summary)
+        
+        def generate():
+            for chunk in session.chat.send_message(message, stream=True):
+                if chunk.text:
+                    yield chunk.text
+        
+        async with session.lock:
+            await self._prepare_turn(conversation_id, session, message)
             
-            # Add current message
-            messages.append({"role": "user", "parts": [message]})
+            parts = []
+            completed = False
+            try:
+                async for text in self.gemini_client.stream('chat', generate):
+                    parts.append(text)
+                    yield text
+                completed = True
+            finally:
+                if not completed and conversation_id is not None:
+                    self.session_pool.discard(conversation_id)
             
-            # Generate response
-            chat = self.model.start_chat(history=messages[:-1])
-            response = chat.send_message(message)
+            await self._record_turn(conversation_id, session, message, "".join(parts))
+    
+    def context_stats(self) -> Dict[str, Any]:
+        """Prompt token statistics and context settings"""
+        return {
+            'history_token_budget': self.history_token_budget,
+            'token_counter': 'model' if self.token_counter.uses_model else 'estimate',
+            'prompt_tokens': self.prompt_token_stats.stats()
+        }
+    
+    async def _open_session(
+        self,
+        conversation_id: Optional[int],
+        conversation_history: Optional[List[Dict[str, str]]],
+        summary: Optional[str]
+    ) -> PooledSession:
+        """
+        Get the chat session for a turn
+        
+        Without conversation_id a throwaway session is built from the
+        history. With one, the pooled session is reused, or a new one is
+        started from the history (which may be empty) and pooled. With
+        the pool disabled every turn needs the history.
+        """
+        if conversation_id is not None:
+            session = self.session_pool.get(conversation_id)
+            if session is not None:
+                return session
+            if conversation_history is None:
+                raise SessionNotFound(conversation_id)
+        
+        session = await self._new_session(conversation_history or [], summary)
+        
+        if conversation_id is not None:
+            self.session_pool.put(conversation_id, session)
+        
+        return session
+    
+    async def _new_session(
+        self,
+        conversation_history: List[Dict[str, str]],
+        summary: Optional[str]
+    ) -> PooledSession:
+        """Start a chat session from the token-budgeted history"""
+        if self.token_counter.uses_model:
+            built = await self.gemini_client.run(
+                'count_tokens', self._build_history, conversation_history, summary
+            )
+        else:
+            built = self._build_history(conversation_history, summary)
+        
+        history, window, tokens, base_tokens = built
+        
+        return PooledSession(
+            self.model.start_chat(history=history),
+            ChatSessionPool.history_size(history),
+            messages=window,
+            summary=summary,
+            tokens=tokens,
+            base_tokens=base_tokens
+        )
+    
+    async def _prepare_turn(
+        self,
+        conversation_id: Optional[int],
+        session: PooledSession,
+        message: str
+    ):
+        """
+        Re-window an over-budget pooled session and record prompt tokens
+        
+        Called with the session lock held.
+        """
+        if session.tokens > session.base_tokens + self.history_token_budget:
+            rebuilt = await self._new_session(session.messages, session.summary)
             
-            return response.text
+            if conversation_id is not None:
+                self.session_pool.grow(conversation_id, rebuilt.size_bytes - session.size_bytes)
             
-        except Exception as e:
-            print(f"Chat error: {e}")
-            return "Xin lỗi, có lỗi xảy ra. Vui lòng thử lại."
+            session.chat = rebuilt.chat
+            session.size_bytes = rebuilt.size_bytes
+            session.messages = rebuilt.messages
+            session.tokens = rebuilt.tokens
+        
+        message_tokens = await self._count_tokens(message)
+        prompt_tokens = session.tokens + message_tokens
+        self.prompt_token_stats.record(prompt_tokens)
+        CHAT_PROMPT_TOKENS.observe(prompt_tokens)
     
-    async def analyze_food(self, image_data: bytes) -> Dict[str, Any]:
+    async def _record_turn(
+        self,
+        conversation_id: Optional[int],
+        session: PooledSession,
+        message: str,
+        response_text: str
+    ):
+        """Append a completed turn to the session's bookkeeping"""
+        session.messages.append({"role": "user", "content": message})
+        session.messages.append({"role": "assistant", "content": response_text})
+        session.tokens += await self._count_tokens(message) + await self._count_tokens(response_text)
+        
+        if conversation_id is not None:
+            added = len(message.encode('utf-8')) + len(response_text.encode('utf-8'))
+            self.session_pool.grow(conversation_id, added)
+    
+    async def _count_tokens(self, text: str) -> int:
+        """Tokens for one message, off the event loop when using the model"""
+        if self.token_counter.uses_model:
+            return await self.gemini_client.run('count_tokens', self.token_counter.count_message, text)
+        return self.token_counter.count_message(text)
+    
+    def _build_history(
+        self,
+        conversation_history: List[Dict[str, str]],
+        summary: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], int, int]:
+        """
+        Chat history for start_chat
+        
+        System prompt, optional summary, then the newest messages that
+        fit in history_token_budget.
+        
+        Returns:
+            (history, selected messages, total tokens, system+summary tokens)
+        """
+        messages = []
+        
+        # Add system prompt
+        messages.append({"role": "user", "parts": [self.chat_system_prompt]})
+        messages.append({"role": "model", "parts": [self.chat_system_ack]})
+        
+        # Add stored summary of earlier conversation
+        if summary:
+            messages.append({"role": "user", "parts": [f"Tóm tắt cuộc trò chuyện trước đó:\n{summary}"]})
+            messages.append({"role": "model", "parts": [self.summary_ack]})
+        
+        base_tokens = sum(
+            self.token_counter.count_message(msg["parts"][0]) for msg in messages
+        )
+        
+        # Add conversation history (newest first within the token budget)
+        window, window_tokens = select_window(
+            conversation_history, self.history_token_budget, self.token_counter
+        )
+        for msg in window:
+            role = "user" if msg["role"] == "user" else "model"
+            messages.append({"role": role, "parts": [msg["content"]]})
+        
+        return messages, window, base_tokens + window_tokens, base_tokens
+    
+    async def analyze_food(self, image_data: Union[bytes, BinaryIO]) -> Dict[str, Any]:
         """
         Analyze food image and estimate calories
         
+        Results are cached by perceptual hash, so re-uploads of the same
+        or a near-identical photo return the stored analysis.
+        
         Args:
-            image_data: Image bytes
+            image_data: Image bytes or a seekable file (e.g. a spooled upload)
         
         Returns:
             Dict with calorie and nutrition analysis
@@ -157,16 +411,24 @@ Trả lời dạng JSON:
         
         try:
             # Create image part for Gemini
-            image_part = {
-                "mime_type": "image/jpeg",
-                "data": base64.b64encode(image_data).decode()
-            }
+            image = await self.image_preprocessor.run(image_data, fingerprint=True)
+            
+            cache_key = image.dhash
+            if cache_key is not None and low_detail(cache_key):
+                cache_key = None
+            
+            if cache_key is not None:
+                cached = self.food_cache.get(cache_key)
+                if cached is not None:
+                    return {**json.loads(cached[0]), "success": True, "cache": "hit"}
             
             # Generate analysis
-            response = self.model.generate_content([
+            start = time.perf_counter()
+            response = await self.gemini_client.run('food', self.model.generate_content, [
                 self.food_analysis_prompt,
-                image_part
+                image.part()
             ])
+            self.image_preprocessor.record_call(time.perf_counter() - start)
             
             # Parse JSON response
             text = response.text.strip()
@@ -180,7 +442,10 @@ Trả lời dạng JSON:
                 text = text[:-3]
             
             result = json.loads(text.strip())
+            if cache_key is not None:
+                self.food_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
             result["success"] = True
+            result["cache"] = "miss"
             return result
             
         except json.JSONDecodeError:
@@ -194,12 +459,58 @@ Trả lời dạng JSON:
             print(f"Food analysis error: {e}")
             return {"success": False, "error": str(e)}
     
-    async def analyze_body(self, image_data: bytes) -> Dict[str, Any]:
+    async def analyze_food_batch(self, images: List[Union[bytes, BinaryIO]]) -> Dict[str, Any]:
+        """
+        Analyze several photos of one meal
+        
+        Images are analyzed concurrently as separate calls (bounded by
+        the food/image concurrency limits), so each keeps the single-image
+        schema and can be served from the perceptual cache.
+        
+        Returns:
+            Dict with per-image results in upload order and the combined total
+        """
+        results = await asyncio.gather(*[self.analyze_food(image) for image in images])
+        return {"items": list(results), "total": self.combine_food_results(results)}
+    
+    @staticmethod
+    def combine_food_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Meal total over successfully parsed food analyses"""
+        total = {
+            "foods": [],
+            "total_calories": 0,
+            "protein_g": 0,
+            "carbs_g": 0,
+            "fat_g": 0,
+            "fiber_g": 0,
+            "analyzed": 0,
+            "failed": 0
+        }
+        
+        for result in results:
+            if not result.get("success") or "error" in result:
+                total["failed"] += 1
+                continue
+            
+            total["analyzed"] += 1
+            total["foods"].extend(result.get("foods") or [])
+            for key in ("total_calories", "protein_g", "carbs_g", "fat_g", "fiber_g"):
+                try:
+                    total[key] += float(result.get(key) or 0)
+                except (TypeError, ValueError):
+                    pass
+        
+        for key in ("total_calories", "protein_g", "carbs_g", "fat_g", "fiber_g"):
+            total[key] = round(total[key], 1)
+        
+        return total
+    
+    async def analyze_body(self, image_data: Union[bytes, BinaryIO]) -> Dict[str, Any]:
         """
         Analyze body image and provide improvement suggestions
         
         Args:
-            image_data: Image bytes
+            image_data: Image bytes or a seekable file (e.g. a spooled upload)
         
         Returns:
             Dict with body analysis and recommendations
@@ -209,16 +520,15 @@ Trả lời dạng JSON:
         
         try:
             # Create image part for Gemini
-            image_part = {
-                "mime_type": "image/jpeg",
-                "data": base64.b64encode(image_data).decode()
-            }
+            image = await self.image_preprocessor.run(image_data)
             
             # Generate analysis
-            response = self.model.generate_content([
+            start = time.perf_counter()
+            response = await self.gemini_client.run('body', self.model.generate_content, [
                 self.body_analysis_prompt,
-                image_part
+                image.part()
             ])
+            self.image_preprocessor.record_call(time.perf_counter() - start)
             
             # Parse JSON response
             text = response.text.strip()
@@ -247,28 +557,50 @@ Trả lời dạng JSON:
     
     async def summarize_conversation(
         self,
-        messages: List[Dict[str, str]]
+        messages: List[Dict[str, str]],
+        previous_summary: Optional[str] = None
     ) -> str:
         """
-        Summarize a conversation when reaching message limit
+        Summarize a conversation
+        
+        With previous_summary, runs incrementally: the summary is updated
+        with only the messages added since it was made, so callers can
+        refresh it in small steps. Without it, summarizes the last 50
+        messages from scratch.
         
         Args:
             messages: List of conversation messages
+            previous_summary: Summary covering the earlier messages
         
         Returns:
             Summary string
         """
         if not self.is_available():
-            return "Tóm tắt cuộc trò chuyện không khả dụng."
+            return self.SUMMARY_UNAVAILABLE
         
         try:
+            if previous_summary is None:
+                messages = messages[-50:]  # Last 50 messages
+            
             # Build conversation text
             conversation_text = "\n".join([
                 f"{'User' if m['role'] == 'user' else 'PT AI'}: {m['content']}"
-                for m in messages[-50:]  # Last 50 messages
+                for m in messages
             ])
             
-            prompt = f"""Tóm tắt cuộc trò chuyện sau thành một đoạn ngắn gọn (tối đa 200 từ).
+            if previous_summary is not None:
+                prompt = f"""Cập nhật bản tóm tắt cuộc trò chuyện dưới đây với các tin nhắn mới, thành một đoạn ngắn gọn (tối đa 200 từ).
+Giữ lại các chủ đề chính, lời khuyên quan trọng, và tiến trình của người dùng.
+
+Tóm tắt hiện tại:
+{previous_summary}
+
+Tin nhắn mới:
+{conversation_text}
+
+Tóm tắt cập nhật:"""
+            else:
+                prompt = f"""Tóm tắt cuộc trò chuyện sau thành một đoạn ngắn gọn (tối đa 200 từ).
 Highlight các chủ đề chính, lời khuyên quan trọng, và tiến trình của người dùng.
 
 Cuộc trò chuyện:
@@ -276,9 +608,9 @@ Cuộc trò chuyện:
 
 Tóm tắt:"""
             
-            response = self.model.generate_content(prompt)
+            response = await self.gemini_client.run('summarize', self.model.generate_content, prompt)
             return response.text
             
         except Exception as e:
             print(f"Summarize error: {e}")
-            return "Không thể tạo tóm tắt."
+            return self.SUMMARY_ERROR
@@ -0,0 +1,180 @@
+"""
+FitAI - Chat Session Pool
+
+Keeps live Gemini chat sessions per conversation so each turn only
+needs the new message. Sessions are evicted when idle, and in LRU
+order when the pool exceeds its session count or memory budget;
+callers then rebuild them from the full conversation history.
+
+A pool lives in one process. Under several uvicorn workers (serve.py)
+turns of a conversation land on different workers, and a worker would
+answer from its own stale session, so serve.py turns pooling off
+(FITAI_CHAT_SESSION_POOL=0): every turn then starts a session from the
+history sent with it, and a turn without history gets SessionNotFound.
+"""
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class SessionNotFound(Exception):
+    """Raised when a conversation has no live session and no history was sent"""
+
+
+class PooledSession:
+    """
+    A live chat session and its bookkeeping
+
+    messages/summary are the conversation the session was started from
+    plus later turns, so it can be rebuilt when its context grows past
+    the token budget; tokens is the session's current prompt size and
+    base_tokens the fixed part (system prompt and summary).
+    """
+
+    def __init__(
+        self,
+        chat: Any,
+        size_bytes: int,
+        messages: Optional[List[Dict[str, str]]] = None,
+        summary: Optional[str] = None,
+        tokens: int = 0,
+        base_tokens: int = 0
+    ):
+        self.chat = chat
+        self.size_bytes = size_bytes
+        self.messages = messages if messages is not None else []
+        self.summary = summary
+        self.tokens = tokens
+        self.base_tokens = base_tokens
+        self.last_used = time.monotonic()
+        # Serializes turns of the same conversation
+        self.lock = asyncio.Lock()
+
+
+class ChatSessionPool:
+    """
+    LRU pool of chat sessions keyed by conversation id
+
+    Limits:
+    - max_sessions: number of live sessions
+    - max_bytes: approximate total size of session history text
+    - idle_ttl_sec: sessions unused for longer are dropped
+
+    A disabled pool keeps nothing: get() always misses and put() is a no-op.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl_sec: float = 1800,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl_sec = idle_ttl_sec
+        self._sessions: "OrderedDict[Any, PooledSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def history_size(messages: List[Dict[str, Any]]) -> int:
+        """Approximate size of start_chat history in bytes"""
+        return sum(
+            len(str(part).encode('utf-8'))
+            for msg in messages
+            for part in msg.get('parts', [])
+        )
+
+    def get(self, conversation_id: Any) -> Optional[PooledSession]:
+        """Return the live session for a conversation, if any"""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(conversation_id)
+            if session is None:
+                self.misses += 1
+                return None
+
+            self._sessions.move_to_end(conversation_id)
+            session.last_used = time.monotonic()
+            self.hits += 1
+            return session
+
+    def __contains__(self, conversation_id: Any) -> bool:
+        with self._lock:
+            self._evict_idle()
+            return conversation_id in self._sessions
+
+    def put(self, conversation_id: Any, session: PooledSession):
+        """Add (or replace) a conversation's session"""
+        if not self.enabled:
+            return
+        with self._lock:
+            old = self._sessions.pop(conversation_id, None)
+            if old is not None:
+                self.total_bytes -= old.size_bytes
+
+            self._sessions[conversation_id] = session
+            self.total_bytes += session.size_bytes
+            self._evict_over_limit()
+
+    def grow(self, conversation_id: Any, added_bytes: int):
+        """Account for text added to (or, if negative, trimmed from) a session"""
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is None:
+                return
+            session.size_bytes += added_bytes
+            session.last_used = time.monotonic()
+            self.total_bytes += added_bytes
+            self._evict_over_limit()
+
+    def discard(self, conversation_id: Any):
+        """Drop a conversation's session"""
+        with self._lock:
+            session = self._sessions.pop(conversation_id, None)
+            if session is not None:
+                self.total_bytes -= session.size_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and hit/miss counters"""
+        return {
+            'enabled': self.enabled,
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _evict_idle(self):
+        """Drop sessions idle longer than idle_ttl_sec (oldest first)"""
+        cutoff = time.monotonic() - self.idle_ttl_sec
+        while self._sessions:
+            conversation_id, session = next(iter(self._sessions.items()))
+            if session.last_used > cutoff:
+                break
+            self._pop_oldest()
+
+    def _evict_over_limit(self):
+        """Drop least recently used sessions until within limits"""
+        self._evict_idle()
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or self.total_bytes > self.max_bytes
+        ):
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        _, session = self._sessions.popitem(last=False)
+        self.total_bytes -= session.size_bytes
+        self.evictions += 1
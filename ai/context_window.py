@@ -0,0 +1,115 @@
+"""
+FitAI - Chat Context Window
+
+Token counting and token-budgeted selection of chat history, so the
+prompt size tracks a budget rather than a fixed message count.
+"""
+
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from cache import LRUCache
+
+# Per-message framing overhead (role markers etc.), in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """
+    Counts tokens per text, cached by content hash
+
+    Modes:
+    - estimate (default): offline estimate from UTF-8 length, no API calls
+    - model: the model's count_tokens, falling back to the estimate on error;
+      this blocks, so call it from a worker thread
+    """
+
+    def __init__(self, model: Any = None, mode: str = 'estimate', cache_size: int = 10000):
+        self.model = model if mode == 'model' else None
+        self.cache = LRUCache(max_size=cache_size)
+
+    @property
+    def uses_model(self) -> bool:
+        return self.model is not None
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        """
+        Rough token estimate
+
+        About four UTF-8 bytes per token; Vietnamese diacritics take
+        extra bytes and extra tokens alike.
+        """
+        return (len(text.encode('utf-8')) + 3) // 4
+
+    def count(self, text: str) -> int:
+        """Tokens in text"""
+        key = hashlib.sha1(text.encode('utf-8')).digest()
+        tokens = self.cache.get(key)
+        if tokens is not None:
+            return tokens
+
+        if self.model is not None:
+            try:
+                tokens = self.model.count_tokens(text).total_tokens
+            except Exception as e:
+                print(f"count_tokens failed, using estimate: {e}")
+
+        if tokens is None:
+            tokens = self.estimate(text)
+
+        self.cache.set(key, tokens)
+        return tokens
+
+    def count_message(self, text: str) -> int:
+        """Tokens for one chat message including framing"""
+        return self.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def select_window(
+    messages: List[Dict[str, str]],
+    budget: int,
+    counter: TokenCounter
+) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Newest-first selection of messages that fit in budget tokens
+
+    Returns the selected messages in chronological order and their tokens.
+    """
+    selected = []
+    used = 0
+
+    for msg in reversed(messages):
+        tokens = counter.count_message(msg['content'])
+        if used + tokens > budget:
+            break
+        selected.append(msg)
+        used += tokens
+
+    selected.reverse()
+    return selected, used
+
+
+class PromptTokenStats:
+    """Running prompt-token statistics for chat calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0
+        self.max = 0
+        self.last = 0
+
+    def record(self, tokens: int):
+        self.calls += 1
+        self.total += tokens
+        self.max = max(self.max, tokens)
+        self.last = tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'total': self.total,
+            'average': round(self.total / self.calls, 1) if self.calls else 0,
+            'max': self.max,
+            'last': self.last
+        }
@@ -9,14 +9,33 @@ Falls back silently to Mode A if GEMINI_API_KEY is not available.
 
 import os
 import json
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import time
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, AsyncIterator
 
-# Try to import google-generativeai, gracefully handle if not installed
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
+from cache import LRUCache
+from local_model import LocalModel
+from metrics import GEMINI_CALLS, GEMINI_LATENCY, GEMINI_QUEUE
+from profiling import current_capture
+from timing import span
+
+
+def _import_genai():
+    """
+    google-generativeai, or None if not installed
+    
+    Imported when the model is first built rather than at module load:
+    the SDK import takes seconds and would slow every worker start.
+    """
+    try:
+        import google.generativeai as genai
+        return genai
+    except ImportError:
+        return None
 
 
 class GeminiClient:
@@ -30,8 +49,35 @@ class GeminiClient:
     - GEMINI_API_KEY is not set
     - google-generativeai package is not installed
     - API call fails for any reason
+    
+    The model backend is pluggable: "backend": "local" (or
+    FITAI_MODEL_BACKEND=local) swaps in the offline LocalModel stand-in.
+    
+    SDK calls are blocking, so they run in a thread pool via run(),
+    with a concurrency limit per call type.
+    
+    The model is built only by initialize(), which the service runs
+    in a thread at startup, so importing and constructing the client
+    stays fast and the SDK import never runs on the event loop; until
+    then .model is None and is_available() is False (Mode A).
+    
+    Plan enhancements are cached per prompt inputs (LRU + TTL), with
+    up to N variants per key so users don't all get identical text.
+    Adjusted-plan enhancements are cached per bucket of quantized
+    completion rate / fatigue plus goal and level.
     """
     
+    # Max concurrent SDK calls per call type (override in gemini.json)
+    DEFAULT_CONCURRENCY = {
+        'enhance': 8,
+        'adjust': 8,
+        'chat': 16,
+        'food': 4,
+        'body': 4,
+        'summarize': 4,
+        'count_tokens': 8
+    }
+    
     def __init__(self):
         """
         Initialize Gemini client from gemini.json config file
@@ -45,42 +91,121 @@ class GeminiClient:
                 "temperature": 0.7,
                 "top_p": 0.9,
                 "max_output_tokens": 1024
+            },
+            "backend": "gemini",
+            "local_model": {"latency_ms": {"p50": 800, "p95": 2500}, "error_rate": 0.0},
+            "concurrency": {"chat": 16, "food": 4},
+            "image_preprocessing": {"max_edge": 1536, "quality": 85, "workers": 4},
+            "cache": {
+                "enhance": {"max_size": 512, "ttl_sec": 86400, "variants": 3},
+                "adjust": {"max_size": 512, "ttl_sec": 86400,
+                           "completion_step": 10, "fatigue_step": 0.5},
+                "food_image": {"max_size": 50000, "max_distance": 4, "ttl_sec": 604800}
             }
         }
         """
-        self.model = None
+        self._model = None
+        self._model_initialized = False
+        self._model_lock = threading.Lock()
+        self.model_init_seconds: Optional[float] = None
         self.config = self._load_config()
+        self.backend = os.environ.get('FITAI_MODEL_BACKEND') or self.config.get('backend', 'gemini')
         
-        # Check if enabled
-        if not self.config.get('enabled', True):
-            print("ℹ Gemini disabled in config")
-            return
+        # Bounded thread pool for blocking SDK calls
+        self.concurrency = {**self.DEFAULT_CONCURRENCY, **self.config.get('concurrency', {})}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(self.concurrency.values()),
+            thread_name_prefix='gemini'
+        )
+        
+        # Enhancement cache
+        enhance_cache_config = self.config.get('cache', {}).get('enhance', {})
+        self.enhance_cache = LRUCache(
+            max_size=enhance_cache_config.get('max_size', 512),
+            ttl_sec=enhance_cache_config.get('ttl_sec', 86400)
+        )
+        self.enhance_variants = max(1, int(enhance_cache_config.get('variants', 3)))
+        
+        # Adjusted-plan cache and its bucket scheme
+        adjust_cache_config = self.config.get('cache', {}).get('adjust', {})
+        self.adjust_cache = LRUCache(
+            max_size=adjust_cache_config.get('max_size', 512),
+            ttl_sec=adjust_cache_config.get('ttl_sec', 86400)
+        )
+        self.adjust_buckets = {
+            'completion_step': adjust_cache_config.get('completion_step', 10),
+            'fatigue_step': adjust_cache_config.get('fatigue_step', 0.5)
+        }
         
         # Get API key from config or environment
         self.api_key = self.config.get('api_key') or os.environ.get('GEMINI_API_KEY')
-        self.model_name = self.config.get('model', 'gemini-1.5-flash')
+        self.model_name = 'local' if self.backend == 'local' else self.config.get('model', 'gemini-1.5-flash')
         self.generation_config = self.config.get('generation_config', {})
+    
+    @property
+    def model(self):
+        """The model backend; None when unavailable or not built yet (see initialize)"""
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_initialized = True
+    
+    @property
+    def model_initialized(self) -> bool:
+        return self._model_initialized
+    
+    def initialize(self):
+        """
+        Build the model once (blocking: may import the SDK)
+        
+        Call it off the event loop: the service does so in its startup
+        task, scripts through asyncio.to_thread or before their loop.
+        """
+        with self._model_lock:
+            if self._model_initialized:
+                return
+            start = time.perf_counter()
+            self._model = self._build_model()
+            self.model_init_seconds = round(time.perf_counter() - start, 3)
+            self._model_initialized = True
+    
+    def _build_model(self):
+        """Model for the configured backend, or None"""
+        # Check if enabled
+        if not self.config.get('enabled', True):
+            print("ℹ Gemini disabled in config")
+            return None
+        
+        # Offline stand-in instead of the Gemini SDK
+        if self.backend == 'local':
+            print("✓ Using local model stand-in (no Gemini calls)")
+            return LocalModel.from_config(self.config.get('local_model', {}))
         
         if not self.api_key:
             print("ℹ Gemini API key not set - using rule-based generator (Mode A)")
             print("  → Set api_key in ai/gemini.json or GEMINI_API_KEY env variable")
-            return
-            
-        if not GENAI_AVAILABLE:
+            return None
+        
+        genai = _import_genai()
+        if genai is None:
             print("ℹ google-generativeai not installed")
             print("  → Run: pip install google-generativeai")
-            return
+            return None
         
         try:
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel(
+            model = genai.GenerativeModel(
                 self.model_name,
                 generation_config=self.generation_config if self.generation_config else None
             )
             print(f"✓ Gemini AI initialized: {self.model_name}")
+            return model
         except Exception as e:
             print(f"✗ Failed to initialize Gemini: {e}")
-            self.model = None
+            return None
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from gemini.json"""
@@ -98,35 +223,151 @@ class GeminiClient:
         return {}
     
     def is_available(self) -> bool:
-        """Check if Gemini API is available"""
-        return self.model is not None
+        """
+        Check if Gemini API is available
+        
+        False until initialize() has built the model, so requests during
+        startup use Mode A instead of building it on the event loop.
+        """
+        return self._model_initialized and self._model is not None
     
-    def enhance_plan(
+    async def run(self, call_type: str, func: Callable, *args, **kwargs):
+        """
+        Run a blocking SDK call without stalling the event loop
+        
+        At most concurrency[call_type] calls of each type run at once;
+        extra callers wait for a slot. Queueing time, latency and
+        outcome are recorded per call type, and on the request's
+        profile capture if it has one; queueing plus latency is the
+        gemini_<call_type> Server-Timing span.
+        """
+        capture = current_capture.get()
+        if capture is not None:
+            func = capture.wrap(func)
+        
+        queued = time.perf_counter()
+        with span(f'gemini_{call_type}'):
+            async with self._semaphore(call_type):
+                start = time.perf_counter()
+                GEMINI_QUEUE.observe(start - queued, call_type=call_type)
+                loop = asyncio.get_running_loop()
+                outcome = 'error'
+                try:
+                    result = await loop.run_in_executor(
+                        self._executor,
+                        functools.partial(func, *args, **kwargs)
+                    )
+                    outcome = 'ok'
+                    return result
+                finally:
+                    GEMINI_LATENCY.observe(time.perf_counter() - start, call_type=call_type)
+                    GEMINI_CALLS.inc(call_type=call_type, outcome=outcome)
+                    if capture is not None:
+                        capture.record_call(call_type, start - queued, time.perf_counter() - start,
+                                            outcome == 'ok')
+    
+    async def stream(self, call_type: str, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Iterate a blocking SDK iterator (e.g. a streamed response)
+        
+        func(*args, **kwargs) is called and iterated in the thread pool;
+        items are handed to the event loop as they arrive. The call type
+        slot is held until the iterator is exhausted, and latency runs
+        until then too.
+        """
+        capture = current_capture.get()
+        queued = time.perf_counter()
+        async with self._semaphore(call_type):
+            start = time.perf_counter()
+            GEMINI_QUEUE.observe(start - queued, call_type=call_type)
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            finished = object()
+            
+            def produce():
+                try:
+                    for item in func(*args, **kwargs):
+                        loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+            
+            loop.run_in_executor(self._executor, capture.wrap(produce) if capture else produce)
+            
+            outcome = 'error'
+            try:
+                while True:
+                    item, error = await queue.get()
+                    if error is not None:
+                        raise error
+                    if item is finished:
+                        break
+                    yield item
+                outcome = 'ok'
+            finally:
+                GEMINI_LATENCY.observe(time.perf_counter() - start, call_type=call_type)
+                GEMINI_CALLS.inc(call_type=call_type, outcome=outcome)
+                if capture is not None:
+                    capture.record_call(call_type, start - queued, time.perf_counter() - start,
+                                        outcome == 'ok')
+    
+    def _semaphore(self, call_type: str) -> asyncio.Semaphore:
+        """Concurrency limiter for a call type"""
+        semaphore = self._semaphores.get(call_type)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(call_type, 4))
+            self._semaphores[call_type] = semaphore
+        return semaphore
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for Gemini response caches"""
+        return {
+            'enhance': {**self.enhance_cache.stats(), 'variants': self.enhance_variants},
+            'adjust': {**self.adjust_cache.stats(), **self.adjust_buckets}
+        }
+    
+    async def enhance_plan(
         self,
         plan: Dict[str, Any],
-        profile: Dict[str, Any]
+        profile: Dict[str, Any],
+        variant_seed: int = 0
     ) -> Optional[Dict[str, Any]]:
         """
         Enhance plan with Gemini-generated notes and principles
         
+        Results are cached by prompt inputs; variant_seed (e.g. the plan
+        seed) picks one of the cached variants for this key.
+        
         Returns None if enhancement fails, allowing fallback to Mode A
         """
         if not self.is_available():
             return None
         
+        cache_key = (
+            self._enhance_cache_key(plan, profile),
+            variant_seed % self.enhance_variants
+        )
+        cached = self.enhance_cache.get(cache_key)
+        if cached is not None:
+            return {'principles': list(cached['principles']), 'notes': list(cached['notes'])}
+        
         try:
             prompt = self._build_enhance_prompt(plan, profile)
-            response = self.model.generate_content(prompt)
+            response = await self.run('enhance', self.model.generate_content, prompt)
             
             # Parse response
             result = self._parse_enhancement_response(response.text)
+            if result is not None:
+                self.enhance_cache.set(cache_key, result)
+                result = {'principles': list(result['principles']), 'notes': list(result['notes'])}
             return result
             
         except Exception as e:
             print(f"Gemini enhancement failed: {e}")
             return None
     
-    def enhance_adjusted_plan(
+    async def enhance_adjusted_plan(
         self,
         plan: Dict[str, Any],
         profile: Dict[str, Any],
@@ -134,21 +375,94 @@ class GeminiClient:
     ) -> Optional[Dict[str, Any]]:
         """
         Enhance adjusted plan with context-aware notes
+        
+        The prompt is built from bucketed log statistics (see
+        adjustment_bucket) so similar weeks share one cached result.
+        The returned dict also carries 'bucket' and 'cache' (hit/miss).
         """
         if not self.is_available():
             return None
         
+        bucket = self.adjustment_bucket(profile, logs_summary)
+        cache_key = tuple(sorted(bucket.items()))
+        
+        cached = self.adjust_cache.get(cache_key)
+        if cached is not None:
+            return {
+                'principles': list(cached['principles']),
+                'notes': list(cached['notes']),
+                'bucket': bucket,
+                'cache': 'hit'
+            }
+        
         try:
-            prompt = self._build_adjustment_prompt(plan, profile, logs_summary)
-            response = self.model.generate_content(prompt)
+            bucketed_summary = {
+                **logs_summary,
+                'completion_rate': bucket['completion_rate'],
+                'average_fatigue': bucket['average_fatigue']
+            }
+            prompt = self._build_adjustment_prompt(plan, profile, bucketed_summary)
+            response = await self.run('adjust', self.model.generate_content, prompt)
             
             result = self._parse_enhancement_response(response.text)
-            return result
+            if result is None:
+                return None
+            
+            self.adjust_cache.set(cache_key, result)
+            return {
+                'principles': list(result['principles']),
+                'notes': list(result['notes']),
+                'bucket': bucket,
+                'cache': 'miss'
+            }
             
         except Exception as e:
             print(f"Gemini adjustment enhancement failed: {e}")
             return None
     
+    def adjustment_bucket(
+        self,
+        profile: Dict[str, Any],
+        logs_summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Quantize adjustment prompt inputs
+        
+        Completion rate and fatigue are floored to completion_step /
+        fatigue_step (default 10% and 0.5).
+        """
+        completion_step = self.adjust_buckets['completion_step']
+        fatigue_step = self.adjust_buckets['fatigue_step']
+        
+        completion_rate = logs_summary.get('completion_rate', 0) or 0
+        avg_fatigue = logs_summary.get('average_fatigue')
+        
+        return {
+            'goal': profile.get('goal', 'maintenance'),
+            'level': profile.get('level', 'intermediate'),
+            'completion_rate': int(completion_rate // completion_step * completion_step),
+            'average_fatigue': (
+                None if avg_fatigue is None
+                else float(avg_fatigue // fatigue_step * fatigue_step)
+            )
+        }
+    
+    def _enhance_cache_key(
+        self,
+        plan: Dict[str, Any],
+        profile: Dict[str, Any]
+    ) -> str:
+        """Normalized hash of everything _build_enhance_prompt uses"""
+        
+        inputs = {
+            'goal': profile.get('goal', 'maintenance'),
+            'level': profile.get('level', 'intermediate'),
+            'equipment': profile.get('equipment', 'cơ bản'),
+            'titles': [d.get('title', '') for d in plan.get('days', [])]
+        }
+        payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
     def _build_enhance_prompt(
         self,
         plan: Dict[str, Any],
@@ -270,6 +584,11 @@ Chỉ xuất JSON, không có văn bản khác."""
             if 'principles' not in data or 'notes' not in data:
                 return None
             
+            # Plans are sent without model validation, so check the types here
+            for items in (data['principles'], data['notes']):
+                if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                    return None
+            
             return {
                 'principles': data['principles'][:5],  # Limit to 5
                 'notes': data['notes'][:5]  # Limit to 5
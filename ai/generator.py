@@ -9,7 +9,59 @@ Generates workout plans based on:
 
 import random
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+
+from timing import span
+
+
+# Allowed exercise equipment / difficulty per profile tier (cumulative)
+EQUIPMENT_LEVELS = {
+    'none': ['none'],
+    'home': ['none', 'home'],
+    'gym': ['none', 'home', 'gym']
+}
+
+DIFFICULTY_LEVELS = {
+    'beginner': ['beginner'],
+    'intermediate': ['beginner', 'intermediate'],
+    'advanced': ['beginner', 'intermediate', 'advanced']
+}
+
+
+class ExerciseIndex:
+    """
+    Exercise catalog bucketed by (equipment tier, difficulty tier, muscle group)
+
+    Built once per catalog so plan generation can draw candidates for a
+    muscle group directly instead of scanning the whole catalog. Tiers
+    are cumulative like _filter_exercises, and every bucket keeps
+    catalog order.
+    """
+
+    def __init__(self, exercises: List[Dict[str, Any]]):
+        self.exercises = exercises
+        self._views: Dict[tuple, Dict[str, List[Dict[str, Any]]]] = {
+            (equipment, level): {}
+            for equipment in EQUIPMENT_LEVELS
+            for level in DIFFICULTY_LEVELS
+        }
+
+        for ex in exercises:
+            for (equipment, level), view in self._views.items():
+                if (ex.get('equipment') in EQUIPMENT_LEVELS[equipment]
+                        and ex.get('difficulty') in DIFFICULTY_LEVELS[level]):
+                    view.setdefault(ex.get('muscle_group'), []).append(ex)
+
+    def view(self, equipment: str, level: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Exercises allowed for a profile, grouped by muscle group"""
+        if equipment not in EQUIPMENT_LEVELS:
+            equipment = 'none'
+        if level not in DIFFICULTY_LEVELS:
+            level = 'beginner'
+        return self._views[(equipment, level)]
+
+    def __len__(self) -> int:
+        return len(self.exercises)
 
 
 class WorkoutPlanGenerator:
@@ -67,13 +119,20 @@ class WorkoutPlanGenerator:
     def generate_plan(
         self,
         profile: Dict[str, Any],
-        exercises: List[Dict[str, Any]],
+        exercises: Union[List[Dict[str, Any]], ExerciseIndex],
         week_start: str,
         seed: int
     ) -> Dict[str, Any]:
-        """Generate a 7-day workout plan"""
+        """
+        Generate a 7-day workout plan
+
+        exercises may be a plain list or a prebuilt ExerciseIndex;
+        both produce the same plan. All randomness comes from a
+        per-plan random.Random(seed), so plans can be generated
+        concurrently and stay reproducible.
+        """
         
-        random.seed(seed)
+        rng = random.Random(seed)
         
         days_per_week = profile.get('days_per_week', 3)
         goal = profile.get('goal', 'maintenance')
@@ -82,8 +141,14 @@ class WorkoutPlanGenerator:
         session_minutes = profile.get('session_minutes', 45)
         availability = profile.get('availability', {})
         
-        # Filter exercises by equipment level
-        available_exercises = self._filter_exercises(exercises, equipment, level)
+        # Exercises allowed by equipment/difficulty, grouped by muscle
+        with span('filter'):
+            if isinstance(exercises, ExerciseIndex):
+                available_exercises = exercises.view(equipment, level)
+            else:
+                available_exercises = self._group_by_muscle(
+                    self._filter_exercises(exercises, equipment, level)
+                )
         
         # Get split strategy
         split = self._get_split_strategy(days_per_week)
@@ -93,17 +158,19 @@ class WorkoutPlanGenerator:
         
         # Generate each workout day
         plan_days = []
-        for i, (date, split_type) in enumerate(zip(workout_days, split)):
-            day_plan = self._generate_day(
-                date=date,
-                split_type=split_type,
-                exercises=available_exercises,
-                goal=goal,
-                level=level,
-                session_minutes=session_minutes,
-                day_index=i
-            )
-            plan_days.append(day_plan)
+        with span('days'):
+            for i, (date, split_type) in enumerate(zip(workout_days, split)):
+                day_plan = self._generate_day(
+                    date=date,
+                    split_type=split_type,
+                    exercises=available_exercises,
+                    goal=goal,
+                    level=level,
+                    session_minutes=session_minutes,
+                    day_index=i,
+                    rng=rng
+                )
+                plan_days.append(day_plan)
         
         # Generate principles and notes
         principles = self._generate_principles(goal, level, days_per_week)
@@ -119,7 +186,7 @@ class WorkoutPlanGenerator:
     def generate_adjusted_plan(
         self,
         profile: Dict[str, Any],
-        exercises: List[Dict[str, Any]],
+        exercises: Union[List[Dict[str, Any]], ExerciseIndex],
         week_start: str,
         previous_plan: Dict[str, Any],
         logs_summary: Dict[str, Any],
@@ -127,8 +194,6 @@ class WorkoutPlanGenerator:
     ) -> Dict[str, Any]:
         """Generate adjusted plan based on previous week's performance"""
         
-        random.seed(seed)
-        
         # Analyze logs to make adjustments
         completion_rate = logs_summary.get('completion_rate', 100)
         avg_fatigue = logs_summary.get('average_fatigue')
@@ -175,20 +240,8 @@ class WorkoutPlanGenerator:
     ) -> List[Dict[str, Any]]:
         """Filter exercises based on equipment and difficulty level"""
         
-        equipment_levels = {
-            'none': ['none'],
-            'home': ['none', 'home'],
-            'gym': ['none', 'home', 'gym']
-        }
-        
-        difficulty_levels = {
-            'beginner': ['beginner'],
-            'intermediate': ['beginner', 'intermediate'],
-            'advanced': ['beginner', 'intermediate', 'advanced']
-        }
-        
-        allowed_equipment = equipment_levels.get(equipment, ['none'])
-        allowed_difficulty = difficulty_levels.get(level, ['beginner'])
+        allowed_equipment = EQUIPMENT_LEVELS.get(equipment, ['none'])
+        allowed_difficulty = DIFFICULTY_LEVELS.get(level, ['beginner'])
         
         filtered = [
             ex for ex in exercises
@@ -198,6 +251,18 @@ class WorkoutPlanGenerator:
         
         return filtered
     
+    def _group_by_muscle(
+        self,
+        exercises: List[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Group exercises by muscle group, keeping their order"""
+        
+        grouped = {}
+        for ex in exercises:
+            grouped.setdefault(ex.get('muscle_group'), []).append(ex)
+        
+        return grouped
+    
     def _get_split_strategy(self, days_per_week: int) -> List[str]:
         """Get workout split based on days per week"""
         
@@ -259,13 +324,19 @@ class WorkoutPlanGenerator:
         self,
         date: str,
         split_type: str,
-        exercises: List[Dict[str, Any]],
+        exercises: Dict[str, List[Dict[str, Any]]],
         goal: str,
         level: str,
         session_minutes: int,
-        day_index: int
+        day_index: int,
+        rng: random.Random
     ) -> Dict[str, Any]:
-        """Generate a single workout day"""
+        """
+        Generate a single workout day
+        
+        exercises maps muscle group to the exercises allowed for the profile;
+        rng is the plan's own random generator
+        """
         
         # Get muscle groups for this split
         target_muscles = self._get_muscles_for_split(split_type)
@@ -274,12 +345,6 @@ class WorkoutPlanGenerator:
         template = self.GOAL_TEMPLATES.get(goal, self.GOAL_TEMPLATES['maintenance'])
         level_mod = self.LEVEL_MODIFIERS.get(level, self.LEVEL_MODIFIERS['intermediate'])
         
-        # Filter exercises for target muscles
-        target_exercises = [
-            ex for ex in exercises
-            if ex.get('muscle_group') in target_muscles
-        ]
-        
         # Calculate exercises per muscle group based on time
         approx_exercises = max(4, min(8, session_minutes // 8))
         exercises_per_group = template['exercises_per_group'] + level_mod['exercises_mod']
@@ -289,21 +354,20 @@ class WorkoutPlanGenerator:
         used_exercises = set()
         
         for muscle in target_muscles:
-            muscle_exercises = [
-                ex for ex in target_exercises
-                if ex.get('muscle_group') == muscle and ex['name'] not in used_exercises
-            ]
-            
-            # Shuffle and select
-            random.shuffle(muscle_exercises)
-            selected = muscle_exercises[:exercises_per_group]
+            # Random selection from this muscle's bucket
+            selected = self._draw_exercises(
+                exercises.get(muscle, []),
+                exercises_per_group,
+                used_exercises,
+                rng
+            )
             
             for ex in selected:
                 used_exercises.add(ex['name'])
                 
-                sets = random.randint(*template['sets_range']) + level_mod['sets_mod']
+                sets = rng.randint(*template['sets_range']) + level_mod['sets_mod']
                 sets = max(2, min(5, sets))
-                reps = random.choice(template['reps_options'])
+                reps = rng.choice(template['reps_options'])
                 
                 sessions.append({
                     'exercise': ex['name'],
@@ -327,6 +391,31 @@ class WorkoutPlanGenerator:
             'estimated_minutes': estimated_minutes
         }
     
+    def _draw_exercises(
+        self,
+        candidates: List[Dict[str, Any]],
+        count: int,
+        used_exercises: set,
+        rng: random.Random
+    ) -> List[Dict[str, Any]]:
+        """
+        Randomly pick up to count exercises not already used today
+        
+        Samples only enough candidates to cover names already used, so
+        the cost does not grow with catalog size.
+        """
+        
+        if count <= 0 or not candidates:
+            return []
+        
+        sample_size = min(len(candidates), count + len(used_exercises))
+        picked = [
+            ex for ex in rng.sample(candidates, sample_size)
+            if ex['name'] not in used_exercises
+        ]
+        
+        return picked[:count]
+    
     def _get_muscles_for_split(self, split_type: str) -> List[str]:
         """Get target muscle groups for a split type"""
         
@@ -0,0 +1,167 @@
+"""
+FitAI - Perceptual Image Cache
+
+Caches image analysis results by perceptual hash, so re-uploads of the
+same meal photo, or near-identical shots of it, skip the Gemini call.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+HASH_BITS = 64
+
+
+def dhash(image, size: int = 8) -> int:
+    """
+    64-bit difference hash of a PIL image
+
+    Each bit says whether a pixel is brighter than its right neighbour
+    in a (size + 1) x size grayscale thumbnail.
+    """
+    gray = image.convert('L').resize((size + 1, size))
+    pixels = list(gray.getdata())
+
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def low_detail(value: int, min_bits: int = 8) -> bool:
+    """
+    Whether a hash is nearly all zeros or ones
+
+    Smooth or blank images hash this way, so unrelated ones would
+    match each other.
+    """
+    ones = bin(value).count('1')
+    return ones < min_bits or ones > HASH_BITS - min_bits
+
+
+def _chunk_masks(parts: int) -> List[Tuple[int, int]]:
+    """(shift, mask) for splitting a hash into parts near-equal chunks"""
+    masks = []
+    shift = 0
+    for i in range(parts):
+        width = HASH_BITS // parts + (i < HASH_BITS % parts)
+        masks.append((shift, (1 << width) - 1))
+        shift += width
+    return masks
+
+
+class PerceptualCache:
+    """
+    LRU cache keyed by 64-bit perceptual hash, matched within max_distance bits
+
+    Lookups use multi-index hashing: each hash is split into
+    max_distance + 1 chunks with one table per chunk. Two hashes within
+    max_distance bits must agree exactly on at least one chunk, so only
+    entries sharing a chunk are compared instead of scanning every entry.
+    """
+
+    def __init__(self, max_size: int = 50000, max_distance: int = 4, ttl_sec: Optional[float] = None):
+        self.max_size = max(1, int(max_size))
+        self.max_distance = max(0, min(int(max_distance), HASH_BITS - 1))
+        self.ttl_sec = ttl_sec
+        self._masks = _chunk_masks(self.max_distance + 1)
+        self._tables: List[Dict[int, set]] = [{} for _ in self._masks]
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.candidates = 0
+
+    def get(self, key: int) -> Optional[Tuple[Any, int]]:
+        """Closest cached (value, distance) within max_distance, or None"""
+        with self._lock:
+            best = None
+            best_distance = self.max_distance + 1
+            now = time.monotonic()
+
+            for candidate in self._candidates(key):
+                self.candidates += 1
+                distance = hamming(key, candidate)
+                if distance >= best_distance:
+                    continue
+
+                expires_at = self._data[candidate][1]
+                if expires_at is not None and expires_at <= now:
+                    self._remove(candidate)
+                    continue
+
+                best, best_distance = candidate, distance
+                if distance == 0:
+                    break
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(best)
+            self.hits += 1
+            self.near_hits += best_distance > 0
+            return self._data[best][0], best_distance
+
+    def set(self, key: int, value: Any):
+        """Store a value, evicting least recently used entries if full"""
+        expires_at = time.monotonic() + self.ttl_sec if self.ttl_sec else None
+
+        with self._lock:
+            if key not in self._data:
+                for table, chunk in zip(self._tables, self._chunks(key)):
+                    table.setdefault(chunk, set()).add(key)
+
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _chunks(self, key: int):
+        return [(key >> shift) & mask for shift, mask in self._masks]
+
+    def _candidates(self, key: int) -> set:
+        found = set()
+        for table, chunk in zip(self._tables, self._chunks(key)):
+            bucket = table.get(chunk)
+            if bucket:
+                found |= bucket
+        return found
+
+    def _remove(self, key: int):
+        del self._data[key]
+        for table, chunk in zip(self._tables, self._chunks(key)):
+            bucket = table[chunk]
+            bucket.discard(key)
+            if not bucket:
+                del table[chunk]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'max_distance': self.max_distance,
+            'ttl_sec': self.ttl_sec,
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'avg_candidates': round(self.candidates / lookups, 1) if lookups else 0.0
+        }
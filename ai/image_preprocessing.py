@@ -0,0 +1,255 @@
+"""
+FitAI - Image Preprocessing
+
+Prepares food and body photos for multimodal Gemini calls: detects the
+real format, applies EXIF orientation, downscales to a maximum edge and
+re-encodes as JPEG, so a multi-megabyte phone photo is uploaded as a
+few hundred kilobytes.
+
+Falls back to sending the original bytes if Pillow is not installed or
+the image can't be decoded (e.g. HEIC without pillow-heif).
+"""
+
+import io
+import time
+import asyncio
+import functools
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+from image_cache import dhash
+from profiling import current_capture
+from timing import span
+
+# Pillow is imported on the first image (or by warm()), not at startup
+PIL_AVAILABLE = importlib.util.find_spec('PIL') is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _pil():
+    """Pillow's Image and ImageOps modules, with the HEIF opener if installed"""
+    from PIL import Image, ImageOps
+
+    # HEIC/HEIF decoding needs the pillow-heif plugin
+    try:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+    except ImportError:
+        pass
+
+    return Image, ImageOps
+
+
+# ISO base media brands used by HEIF-family images
+_HEIC_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis'}
+_HEIF_BRANDS = {b'mif1', b'msf1', b'heif'}
+_AVIF_BRANDS = {b'avif', b'avis'}
+
+# EXIF orientation tag
+_ORIENTATION = 0x0112
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Image MIME type from magic bytes, or None if unrecognised"""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:8] == b'ftyp':
+        brand = data[8:12]
+        if brand in _HEIC_BRANDS:
+            return 'image/heic'
+        if brand in _HEIF_BRANDS:
+            return 'image/heif'
+        if brand in _AVIF_BRANDS:
+            return 'image/avif'
+    if data[:2] == b'BM':
+        return 'image/bmp'
+    return None
+
+
+class PreparedImage:
+    """Image bytes ready for upload, with their MIME type and optional dHash"""
+
+    def __init__(
+        self,
+        data: bytes,
+        mime_type: str,
+        original_bytes: int,
+        reencoded: bool = False,
+        dhash: Optional[int] = None
+    ):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.reencoded = reencoded
+        self.dhash = dhash
+
+    def part(self) -> Dict[str, Any]:
+        """Inline image part for generate_content"""
+        return {'mime_type': self.mime_type, 'data': self.data}
+
+
+class ImagePreprocessor:
+    """
+    Downscale and re-encode uploads before they are sent to Gemini
+
+    Small JPEGs that need no rotation are passed through unchanged, as
+    re-encoding them only costs quality. prepare() is CPU-bound; run()
+    calls it on the preprocessor's own threads, apart from the Gemini
+    client's pool and metrics.
+
+    Accepts bytes or a seekable file (e.g. a spooled upload); a file is
+    decoded in place and only read into memory if it is passed through.
+
+    Settings (gemini.json "image_preprocessing"):
+    - enabled: default true
+    - max_edge: longest side in pixels (default 1536)
+    - quality: JPEG quality (default 85)
+    - workers: images preprocessed at once (default 4)
+    """
+
+    def __init__(self, enabled: bool = True, max_edge: int = 1536, quality: int = 85, workers: int = 4):
+        self.enabled = enabled and PIL_AVAILABLE
+        self.max_edge = max_edge
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='image')
+
+        # Updated from the preprocessing threads
+        self._lock = threading.Lock()
+        self.images = 0
+        self.reencoded = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.preprocess_sec = 0.0
+        self.calls = 0
+        self.call_sec = 0.0
+
+    def warm(self):
+        """Import Pillow ahead of the first upload"""
+        if self.enabled:
+            _pil()
+
+    async def run(self, source: Union[bytes, BinaryIO], fingerprint: bool = False) -> PreparedImage:
+        """prepare() on the preprocessing threads, timed as the image_preprocess span"""
+        func = functools.partial(self.prepare, source, fingerprint=fingerprint)
+        capture = current_capture.get()
+        if capture is not None:
+            func = capture.wrap(func)
+        with span('image_preprocess'):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    def prepare(self, source: Union[bytes, BinaryIO], fingerprint: bool = False) -> PreparedImage:
+        """
+        Preprocess one uploaded image
+
+        With fingerprint, also computes the perceptual hash of the
+        oriented image (left as None when preprocessing is unavailable).
+        """
+        start = time.perf_counter()
+        stream = io.BytesIO(source) if isinstance(source, bytes) else source
+        stream.seek(0)
+        mime_type = sniff_mime_type(stream.read(32)) or 'image/jpeg'
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(0)
+
+        encoded, image_hash = None, None
+        if self.enabled:
+            try:
+                encoded, image_hash = self._reencode(stream, size, mime_type, fingerprint)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"⚠ Image preprocessing failed, sending original: {e}")
+
+        if encoded is not None:
+            prepared = PreparedImage(encoded, 'image/jpeg', size, reencoded=True, dhash=image_hash)
+        else:
+            if isinstance(source, bytes):
+                data = source
+            else:
+                stream.seek(0)
+                data = stream.read()
+            prepared = PreparedImage(data, mime_type, size, dhash=image_hash)
+
+        with self._lock:
+            self.images += 1
+            self.reencoded += prepared.reencoded
+            self.bytes_in += size
+            self.bytes_out += len(prepared.data)
+            self.preprocess_sec += time.perf_counter() - start
+        return prepared
+
+    def _reencode(
+        self,
+        stream: BinaryIO,
+        size: int,
+        mime_type: str,
+        fingerprint: bool
+    ) -> Tuple[Optional[bytes], Optional[int]]:
+        """Oriented, downscaled JPEG (None to keep the original) and dHash"""
+        Image, ImageOps = _pil()
+        with Image.open(stream) as image:
+            orientation = image.getexif().get(_ORIENTATION, 1)
+            width, height = image.size
+            scale = self.max_edge / max(width, height)
+
+            if scale >= 1 and orientation == 1 and mime_type == 'image/jpeg':
+                if not fingerprint:
+                    return None, None
+                image.draft('L', (64, 64))
+                return None, dhash(image)
+
+            # Let the JPEG decoder downscale by a power of two first
+            if scale < 1:
+                image.draft('RGB', (int(width * scale) + 1, int(height * scale) + 1))
+
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((self.max_edge, self.max_edge))
+
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            image_hash = dhash(image) if fingerprint else None
+
+            out = io.BytesIO()
+            image.save(out, format='JPEG', quality=self.quality)
+
+        encoded = out.getvalue()
+        if len(encoded) >= size and orientation == 1 and mime_type == 'image/jpeg':
+            return None, image_hash
+
+        return encoded, image_hash
+
+    def record_call(self, elapsed_sec: float):
+        """Record the duration of a model call made with a prepared image"""
+        with self._lock:
+            self.calls += 1
+            self.call_sec += elapsed_sec
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'max_edge': self.max_edge,
+            'quality': self.quality,
+            'images': self.images,
+            'reencoded': self.reencoded,
+            'failed': self.failed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'bytes_saved_ratio': round(1 - self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0,
+            'avg_preprocess_ms': round(self.preprocess_sec * 1000 / self.images, 1) if self.images else 0,
+            'avg_call_ms': round(self.call_sec * 1000 / self.calls, 1) if self.calls else 0
+        }
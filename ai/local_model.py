@@ -0,0 +1,203 @@
+"""
+FitAI - Local Model Stand-in
+
+Offline replacement for the Gemini model object, for load testing and
+development without an API key or quota. It implements the SDK surface
+the service uses (generate_content, start_chat/send_message,
+count_tokens, streaming) with simulated latency, injected errors and
+canned responses matching each prompt's JSON schema.
+
+Enable with "backend": "local" in gemini.json or FITAI_MODEL_BACKEND=local.
+"""
+
+import json
+import math
+import time
+import random
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+
+FOOD_RESPONSE = {
+    "foods": ["Cơm trắng", "Ức gà nướng", "Rau luộc"],
+    "total_calories": 550,
+    "protein_g": 40,
+    "carbs_g": 60,
+    "fat_g": 12,
+    "fiber_g": 6,
+    "rating": "good",
+    "rating_reason": "Cân bằng đạm và tinh bột",
+    "suggestions": ["Thêm rau xanh", "Giảm nước sốt"],
+    "summary": "Bữa ăn cân bằng, phù hợp mục tiêu tập luyện"
+}
+
+BODY_RESPONSE = {
+    "overall_assessment": "Hình thể cân đối, nền tảng tốt",
+    "body_type": "mesomorph",
+    "strengths": ["Vai", "Đùi"],
+    "areas_to_improve": ["Ngực", "Lưng xô"],
+    "recommended_exercises": [
+        {"muscle": "chest", "exercises": ["Push-up", "Bench Press"]},
+        {"muscle": "back", "exercises": ["Pull-up"]}
+    ],
+    "short_term_goals": ["Tăng sức đẩy ngực", "Cải thiện tư thế"],
+    "tips": ["Ngủ đủ 7-8 tiếng", "Ăn đủ đạm"],
+    "disclaimer": "Đánh giá sơ bộ dựa trên hình ảnh"
+}
+
+PLAN_RESPONSE = {
+    "principles": [
+        "Khởi động kỹ trước mỗi buổi tập",
+        "Tăng tải từ từ mỗi tuần",
+        "Ngủ đủ giấc để phục hồi"
+    ],
+    "notes": [
+        "Giữ kỹ thuật đúng trước khi tăng tạ",
+        "Uống đủ nước trong buổi tập"
+    ]
+}
+
+CHAT_RESPONSE = (
+    "Để tăng cơ hiệu quả, bạn nên tập mỗi nhóm cơ 2 lần/tuần, tăng tải dần "
+    "và ăn đủ 1.6-2g đạm/kg cân nặng. Đừng quên ngủ đủ giấc để cơ phục hồi nhé!"
+)
+
+SUMMARY_RESPONSE = (
+    "Người dùng hỏi về lịch tập tăng cơ và dinh dưỡng; PT AI khuyên tập mỗi "
+    "nhóm cơ 2 lần/tuần, tăng tải dần và ăn đủ đạm."
+)
+
+
+class LocalModelError(Exception):
+    """Injected failure, standing in for an API error"""
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _TokenCount:
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+class LocalModel:
+    """
+    Stand-in for genai.GenerativeModel
+
+    Latency is log-normal, fitted to the configured p50/p95. Streaming
+    yields the response in chunks after the first-chunk latency.
+
+    Settings (gemini.json "local_model"):
+    - latency_ms: {"p50": 800, "p95": 2500}
+    - stream_chunks: chunks per streamed response (default 8)
+    - chunk_delay_ms: delay between streamed chunks (default 40)
+    - error_rate: fraction of calls that raise (default 0)
+    - seed: RNG seed for reproducible runs
+    """
+
+    def __init__(
+        self,
+        latency_ms: Optional[Dict[str, float]] = None,
+        stream_chunks: int = 8,
+        chunk_delay_ms: float = 40,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        latency_ms = latency_ms or {}
+        p50 = max(float(latency_ms.get('p50', 800)), 0.001)
+        p95 = max(float(latency_ms.get('p95', p50 * 3)), p50)
+        self._mu = math.log(p50)
+        self._sigma = math.log(p95 / p50) / 1.645
+        self.stream_chunks = max(1, int(stream_chunks))
+        self.chunk_delay_ms = chunk_delay_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'LocalModel':
+        return cls(
+            latency_ms=config.get('latency_ms'),
+            stream_chunks=config.get('stream_chunks', 8),
+            chunk_delay_ms=config.get('chunk_delay_ms', 40),
+            error_rate=config.get('error_rate', 0.0),
+            seed=config.get('seed')
+        )
+
+    # ---- SDK surface ----
+
+    def generate_content(self, contents: Any, stream: bool = False):
+        text = self._respond(self._prompt_text(contents))
+        if stream:
+            return self._stream(text)
+        self._wait()
+        return _Response(text)
+
+    def start_chat(self, history: Optional[List[Dict[str, Any]]] = None) -> 'LocalChat':
+        return LocalChat(self, history)
+
+    def count_tokens(self, contents: Any) -> _TokenCount:
+        text = self._prompt_text(contents)
+        return _TokenCount((len(text.encode('utf-8')) + 3) // 4)
+
+    # ---- Simulation ----
+
+    def _wait(self):
+        with self._lock:
+            latency_ms = self._rng.lognormvariate(self._mu, self._sigma)
+            failed = self._rng.random() < self.error_rate
+        time.sleep(latency_ms / 1000)
+        if failed:
+            raise LocalModelError("local model: injected error")
+
+    def _stream(self, text: str) -> Iterator[_Response]:
+        self._wait()
+        size = math.ceil(len(text) / self.stream_chunks)
+        for i in range(0, len(text), size):
+            if i:
+                time.sleep(self.chunk_delay_ms / 1000)
+            yield _Response(text[i:i + size])
+
+    @staticmethod
+    def _prompt_text(contents: Any) -> str:
+        """Text parts of a prompt (images and other parts skipped)"""
+        if isinstance(contents, str):
+            return contents
+        if isinstance(contents, dict):
+            return ' '.join(str(part) for part in contents.get('parts', []) if isinstance(part, str))
+        if isinstance(contents, list):
+            return ' '.join(LocalModel._prompt_text(part) for part in contents)
+        return ''
+
+    @staticmethod
+    def _respond(prompt: str) -> str:
+        """Canned response matching the schema the prompt asks for"""
+        if '"total_calories"' in prompt:
+            payload = FOOD_RESPONSE
+        elif '"body_type"' in prompt:
+            payload = BODY_RESPONSE
+        elif '"principles"' in prompt:
+            payload = PLAN_RESPONSE
+        elif 'Tóm tắt' in prompt:
+            return SUMMARY_RESPONSE
+        else:
+            return CHAT_RESPONSE
+        return '```json\n' + json.dumps(payload, ensure_ascii=False, indent=2) + '\n```'
+
+
+class LocalChat:
+    """Stand-in for a ChatSession"""
+
+    def __init__(self, model: LocalModel, history: Optional[List[Dict[str, Any]]] = None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message: str, stream: bool = False):
+        self.history.append({'role': 'user', 'parts': [message]})
+        self.history.append({'role': 'model', 'parts': [CHAT_RESPONSE]})
+        if stream:
+            return self.model._stream(CHAT_RESPONSE)
+        self.model._wait()
+        return _Response(CHAT_RESPONSE)
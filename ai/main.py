@@ -5,28 +5,124 @@ FastAPI application for workout plan generation
 Modes:
 - Mode A (default): Rule-based plan generator (always available offline)
 - Mode B (optional): Gemini AI enhancement when GEMINI_API_KEY is present
+
+Startup is kept fast: the Gemini SDK and Pillow are imported lazily and
+the model is built in the background after the server starts. /health
+answers as soon as the process is up; /ready turns 200 once the model
+is initialized and the warmup (FITAI_WARMUP, default on) has run.
+
+Mode A plans for catalog requests are memoized in process, up to
+FITAI_PLAN_CACHE_MB (default 32; 0 disables).
+
+Plan responses skip Pydantic and are encoded straight from generator
+output (responses.py); FITAI_VALIDATE_PLANS=1 validates them first.
 """
 
 import os
-import hashlib
+import json
+import time
+import asyncio
+import pickle
+import inspect
 import random
+import functools
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union, Callable
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 
-from generator import WorkoutPlanGenerator
+from generator import WorkoutPlanGenerator, ExerciseIndex
 from gemini_client import GeminiClient
 from chat_handler import ChatHandler
+from uploads import UploadLimitMiddleware, upload_source, MAX_UPLOAD_BYTES
+from chat_sessions import SessionNotFound
+from batch import BatchPlanRunner
+from catalog import CatalogRegistry
+from metrics import MetricsMiddleware, REGISTRY, CONTENT_TYPE, PLAN_STORE_LOOKUPS, record_plan
+from profiling import ProfileStore, ProfilingMiddleware, check_admin_token
+from timing import timed_request, current_timings, span
+from plan_store import PlanStore, profile_hash
+from plans import plan_seed, apply_enhancement
+from cache import LRUCache
+from responses import plan_content, plan_json_response, dumps
+
+# ============== Server-Timing ==============
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Async endpoint that marks when it starts and returns"""
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        timings = current_timings()
+        if timings is None:
+            return await endpoint(*args, **kwargs)
+        timings.mark('endpoint_start')
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings.mark('endpoint_end')
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route that sends a Server-Timing header with the request's spans
+    
+    Adds validate (body read, parsing and request-model validation),
+    serialize (FastAPI's response-model check and JSON encoding after
+    the endpoint returns) and total. Streamed responses send the header
+    before the body, so it only covers work done before streaming.
+    """
+    
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        
+        async def timed_handler(request):
+            with timed_request() as timings:
+                start = time.perf_counter()
+                response = await handler(request)
+            end = time.perf_counter()
+            
+            marks = timings.marks
+            if 'endpoint_start' in marks:
+                timings.spans = {'validate': marks['endpoint_start'] - start, **timings.spans}
+                timings.add('serialize', end - marks['endpoint_end'])
+            timings.add('total', end - start)
+            response.headers['Server-Timing'] = timings.header()
+            return response
+        
+        return timed_handler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Initialize in the background so the server accepts connections at
+    once; on shutdown stop batch worker processes and close the plan store
+    """
+    app.state.initialization = asyncio.create_task(_initialize())
+    yield
+    batch_runner.shutdown()
+    plan_store.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="FitAI Plan Generator",
     description="AI-powered workout plan generation service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+app.router.route_class = TimedRoute
 
 # CORS middleware
 app.add_middleware(
@@ -37,10 +133,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized image uploads while they are being received
+MAX_BATCH_IMAGES = int(os.environ.get('FITAI_MAX_BATCH_IMAGES', 0)) or 8
+app.add_middleware(UploadLimitMiddleware, paths=["/analyze_food", "/analyze_body"])
+app.add_middleware(
+    UploadLimitMiddleware,
+    paths=["/analyze_food_batch"],
+    max_bytes=MAX_UPLOAD_BYTES * MAX_BATCH_IMAGES
+)
+
+# Opt-in cProfile capture of single requests (admin header or sampling)
+profile_store = ProfileStore()
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+# Request counts, latency and in-flight gauges for /metrics (outermost)
+app.add_middleware(MetricsMiddleware)
+
 # Initialize services
 generator = WorkoutPlanGenerator()
 gemini_client = GeminiClient()
 chat_handler = ChatHandler(gemini_client)
+batch_runner = BatchPlanRunner()
+catalog_registry = CatalogRegistry()
+plan_store = PlanStore()
+
+VALIDATE_PLANS = os.environ.get('FITAI_VALIDATE_PLANS', '0').lower() in ('1', 'true', 'yes')
+
+# Mode A plans pickled: sized exactly, and each hit decodes a fresh copy
+PLAN_CACHE_BYTES = int(float(os.environ.get('FITAI_PLAN_CACHE_MB', 32)) * 1024 * 1024)
+plan_cache = LRUCache(max_size=1_000_000, max_bytes=PLAN_CACHE_BYTES) if PLAN_CACHE_BYTES > 0 else None
+
+WARMUP_ENABLED = os.environ.get('FITAI_WARMUP', '1').lower() not in ('0', 'false', 'no')
+startup_state: Dict[str, Any] = {
+    "ready": False,
+    "failed": False,
+    "model_init_sec": None,
+    "warmup_sec": None,
+    "error": None
+}
 
 
 # ============== Pydantic Models ==============
@@ -67,7 +197,20 @@ class GeneratePlanRequest(BaseModel):
     user_id: int
     week_start: str  # YYYY-MM-DD
     profile: ProfileData
-    exercises: List[Exercise]
+    exercises: Optional[List[Exercise]] = None
+    catalog_version: Optional[str] = None  # Used when exercises is omitted
+
+
+class BatchPlanEntry(BaseModel):
+    user_id: int
+    week_start: str  # YYYY-MM-DD
+    profile: ProfileData
+
+
+class GeneratePlansBatchRequest(BaseModel):
+    entries: List[BatchPlanEntry]
+    exercises: Optional[List[Exercise]] = None
+    catalog_version: Optional[str] = None
 
 
 class LogSummary(BaseModel):
@@ -95,11 +238,21 @@ class AdjustPlanRequest(BaseModel):
     user_id: int
     week_start: str
     profile: ProfileData
-    exercises: List[Exercise]
+    exercises: Optional[List[Exercise]] = None
+    catalog_version: Optional[str] = None
     previous_plan: PreviousPlan
     logs_summary: LogsStatistics
 
 
+class CatalogUploadRequest(BaseModel):
+    exercises: List[Exercise]
+
+
+class CatalogInfo(BaseModel):
+    version: Optional[str] = None
+    count: int
+
+
 class SessionItem(BaseModel):
     exercise: str
     sets: int
@@ -120,6 +273,112 @@ class PlanResponse(BaseModel):
     days: List[PlanDay]
     principles: List[str]
     notes: List[str]
+    metadata: Optional[Dict[str, Any]] = None  # Debug info, e.g. enhancement cache
+
+
+# ============== Helpers ==============
+
+def _resolve_exercises(
+    exercises: Optional[List[Exercise]],
+    catalog_version: Optional[str]
+) -> Union[List[Dict[str, Any]], ExerciseIndex]:
+    """
+    Get the exercises for a plan request
+
+    Inline exercises take precedence; otherwise catalog_version must
+    match the registered catalog (409 if it is stale or missing), whose
+    prebuilt index is returned.
+    """
+    if exercises is not None:
+        with span('catalog'):
+            return [ex.model_dump() for ex in exercises]
+
+    if not catalog_version:
+        raise HTTPException(status_code=400, detail="Either exercises or catalog_version is required")
+
+    catalog = catalog_registry.get(catalog_version)
+    if catalog is None:
+        current = catalog_registry.current
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "catalog_version_stale",
+                "current_version": current.version if current else None
+            }
+        )
+
+    return catalog.index
+
+
+def _require_admin(token: Optional[str]):
+    """403 unless X-Admin-Token matches FITAI_ADMIN_TOKEN"""
+    if not check_admin_token(token):
+        raise HTTPException(status_code=403, detail="Admin token missing or invalid")
+
+
+def _stored_plan(
+    user_id: int,
+    week_start: str,
+    catalog_version: str,
+    profile: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Plan precomputed by precompute.py for this request, if any
+
+    A stored Mode A plan is skipped while Gemini is available, so the
+    request gets an enhanced plan instead.
+    """
+    found = plan_store.get(user_id, week_start, catalog_version, profile_hash(profile))
+    if found is not None and found[1] == 'A' and gemini_client.is_available():
+        found = None
+    PLAN_STORE_LOOKUPS.inc(outcome='miss' if found is None else 'hit')
+    if found is None:
+        return None
+    plan, mode = found
+    record_plan('generate_plan', gemini_client.is_available(), plan if mode == 'B' else None)
+    return plan
+
+
+def _memoized_plan(
+    user_id: int,
+    week_start: str,
+    catalog_version: str,
+    profile: Dict[str, Any],
+    seed: int,
+    exercises: ExerciseIndex
+) -> Dict[str, Any]:
+    """
+    Mode A plan for a catalog request, from the plan cache if present
+
+    The plan is a pure function of the key: the seed comes from user
+    and week, and a changed profile or catalog hashes to a new key.
+    Inline-exercise requests are not memoized, since hashing the
+    exercise list costs about as much as generating the plan.
+    """
+    key = (user_id, week_start, catalog_version, profile_hash(profile))
+    with span('plan_cache'):
+        cached = plan_cache.get(key)
+        if cached is not None:
+            return pickle.loads(cached)
+
+    plan = generator.generate_plan(profile=profile, exercises=exercises, week_start=week_start, seed=seed)
+    plan_cache.set(key, pickle.dumps(plan, protocol=pickle.HIGHEST_PROTOCOL))
+    return plan
+
+
+def _plan_response(plan: Dict[str, Any]) -> Response:
+    """
+    Plan as JSON, without building PlanResponse
+
+    Same bytes as FastAPI's response_model serialization, for a
+    fraction of the CPU; response_model stays on the routes for the
+    OpenAPI schema.
+    """
+    if VALIDATE_PLANS:
+        with span('response_validation'):
+            PlanResponse(**plan)
+    with span('serialize'):
+        return plan_json_response(plan)
 
 
 # ============== Endpoints ==============
@@ -132,45 +391,84 @@ async def health_check():
         "service": "FitAI Plan Generator",
         "version": "1.0.0",
         "gemini_available": gemini_client.is_available(),
+        "gemini_cache": gemini_client.cache_stats(),
+        "chat_sessions": chat_handler.session_pool.stats(),
+        "chat_context": chat_handler.context_stats(),
+        "image_preprocessing": chat_handler.image_preprocessor.stats(),
+        "food_image_cache": chat_handler.food_cache.stats(),
+        "profiling": profile_store.stats(),
+        "plan_store": plan_store.stats(),
+        "plan_cache": plan_cache.stats() if plan_cache is not None else None,
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 503 until the model is initialized and warmup has run, or if that failed"""
+    if startup_state["ready"]:
+        status = "ready"
+    else:
+        status = "failed" if startup_state["failed"] else "starting"
+    body = {"status": status, **startup_state}
+    return JSONResponse(content=body, status_code=200 if startup_state["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Request, model call, plan mode and upload metrics in Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.post("/generate_plan", response_model=PlanResponse)
 async def generate_plan(request: GeneratePlanRequest):
     """
     Generate a 7-day workout plan based on user profile
     
     Uses rule-based generator (Mode A) and optionally enhances
-    with Gemini AI for notes/principles (Mode B)
+    with Gemini AI for notes/principles (Mode B). Catalog requests are
+    first looked up among the plans precomputed by precompute.py.
     """
+    # Inline exercises or the registered catalog
+    exercises_dict = _resolve_exercises(request.exercises, request.catalog_version)
+    profile = request.profile.model_dump()
+
     try:
-        # Generate deterministic seed from user_id + week_start
-        seed_string = f"{request.user_id}-{request.week_start}"
-        seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16)
+        if request.exercises is None:
+            with span('plan_store'):
+                stored = _stored_plan(request.user_id, request.week_start, request.catalog_version, profile)
+            if stored is not None:
+                return _plan_response(stored)
         
-        # Convert exercises to dict format
-        exercises_dict = [ex.model_dump() for ex in request.exercises]
+        # Generate deterministic seed from user_id + week_start
+        seed = plan_seed(f"{request.user_id}-{request.week_start}")
         
         # Generate plan using rule-based generator (Mode A)
-        plan = generator.generate_plan(
-            profile=request.profile.model_dump(),
-            exercises=exercises_dict,
-            week_start=request.week_start,
-            seed=seed
-        )
+        if request.exercises is None and plan_cache is not None:
+            plan = _memoized_plan(
+                request.user_id, request.week_start, request.catalog_version, profile, seed, exercises_dict
+            )
+        else:
+            plan = generator.generate_plan(
+                profile=profile,
+                exercises=exercises_dict,
+                week_start=request.week_start,
+                seed=seed
+            )
         
-        # Optionally enhance with Gemini (Mode B)
+        # Optionally enhance with Gemini (Mode B, cached separately)
+        enhanced = None
         if gemini_client.is_available():
-            enhanced = gemini_client.enhance_plan(
-                plan=plan,
-                profile=request.profile.model_dump()
-            )
-            if enhanced:
-                plan['principles'] = enhanced.get('principles', plan['principles'])
-                plan['notes'] = enhanced.get('notes', plan['notes'])
+            with span('enhance'):
+                enhanced = await gemini_client.enhance_plan(
+                    plan=plan,
+                    profile=profile,
+                    variant_seed=seed
+                )
+            apply_enhancement(plan, enhanced)
+        record_plan('generate_plan', gemini_client.is_available(), enhanced)
         
-        return PlanResponse(**plan)
+        return _plan_response(plan)
         
     except Exception as e:
         print(f"Error generating plan: {e}")
@@ -187,13 +485,12 @@ async def adjust_plan(request: AdjustPlanRequest):
     - Average fatigue levels
     - Skipped sessions
     """
+    # Inline exercises or the registered catalog
+    exercises_dict = _resolve_exercises(request.exercises, request.catalog_version)
+
     try:
         # Generate deterministic seed
-        seed_string = f"{request.user_id}-{request.week_start}-adjusted"
-        seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16)
-        
-        # Convert exercises to dict format
-        exercises_dict = [ex.model_dump() for ex in request.exercises]
+        seed = plan_seed(f"{request.user_id}-{request.week_start}-adjusted")
         
         # Generate adjusted plan
         plan = generator.generate_adjusted_plan(
@@ -206,23 +503,203 @@ async def adjust_plan(request: AdjustPlanRequest):
         )
         
         # Optionally enhance with Gemini
+        enhanced = None
         if gemini_client.is_available():
-            enhanced = gemini_client.enhance_adjusted_plan(
-                plan=plan,
-                profile=request.profile.model_dump(),
-                logs_summary=request.logs_summary.model_dump()
-            )
+            with span('enhance'):
+                enhanced = await gemini_client.enhance_adjusted_plan(
+                    plan=plan,
+                    profile=request.profile.model_dump(),
+                    logs_summary=request.logs_summary.model_dump()
+                )
+            apply_enhancement(plan, enhanced)
             if enhanced:
-                plan['principles'] = enhanced.get('principles', plan['principles'])
-                plan['notes'] = enhanced.get('notes', plan['notes'])
+                plan['metadata'] = {
+                    'enhancement': {
+                        'cache': enhanced['cache'],
+                        'bucket': enhanced['bucket'],
+                        'scheme': gemini_client.adjust_buckets
+                    }
+                }
+        record_plan('adjust_plan', gemini_client.is_available(), enhanced)
         
-        return PlanResponse(**plan)
+        return _plan_response(plan)
         
     except Exception as e:
         print(f"Error adjusting plan: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate_plans_batch")
+async def generate_plans_batch(request: GeneratePlansBatchRequest):
+    """
+    Generate plans for many users against one shared exercise catalog
+
+    Work is fanned out across a process pool and results are streamed
+    back as NDJSON, one line per entry, in completion order. Each plan
+    matches what /generate_plan returns for the same user and week.
+    """
+    exercises_dict = _resolve_exercises(request.exercises, request.catalog_version)
+    entries = [
+        {
+            'index': i,
+            'profile': entry.profile.model_dump(),
+            'week_start': entry.week_start,
+            'seed': plan_seed(f"{entry.user_id}-{entry.week_start}")
+        }
+        for i, entry in enumerate(request.entries)
+    ]
+
+    async def stream_results():
+        catalog_key = request.catalog_version if request.exercises is None else None
+        async for result in batch_runner.run(exercises_dict, entries, catalog_key):
+            entry = request.entries[result['index']]
+            line = {
+                'index': result['index'],
+                'user_id': entry.user_id,
+                'week_start': entry.week_start
+            }
+
+            try:
+                if 'error' in result:
+                    raise ValueError(result['error'])
+
+                plan = result['plan']
+                enhanced = None
+                if gemini_client.is_available():
+                    enhanced = await gemini_client.enhance_plan(
+                        plan=plan,
+                        profile=entries[result['index']]['profile'],
+                        variant_seed=entries[result['index']]['seed']
+                    )
+                    apply_enhancement(plan, enhanced)
+                record_plan('generate_plans_batch', gemini_client.is_available(), enhanced)
+
+                line['success'] = True
+                if VALIDATE_PLANS:
+                    PlanResponse(**plan)
+                line['plan'] = plan_content(plan)
+            except Exception as e:
+                print(f"Error generating batch plan for user {entry.user_id}: {e}")
+                line['success'] = False
+                line['error'] = str(e)
+
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.get("/catalog", response_model=CatalogInfo)
+async def get_catalog():
+    """Return the registered exercise catalog version"""
+    current = catalog_registry.current
+    if current is None:
+        return CatalogInfo(version=None, count=0)
+    return CatalogInfo(version=current.version, count=len(current))
+
+
+@app.put("/catalog", response_model=CatalogInfo)
+async def upload_catalog(request: CatalogUploadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Replace the registered exercise catalog
+
+    Requires X-Admin-Token (FITAI_ADMIN_TOKEN). Returns the content hash
+    to send as catalog_version on plan requests.
+    """
+    _require_admin(x_admin_token)
+    previous = catalog_registry.current
+    # Indexing and persisting a large catalog would stall the event loop
+    catalog = await asyncio.to_thread(
+        catalog_registry.replace, [ex.model_dump() for ex in request.exercises]
+    )
+    if plan_cache is not None and (previous is None or previous.version != catalog.version):
+        # Plans of the old catalog can no longer be requested
+        plan_cache.clear()
+    return CatalogInfo(version=catalog.version, count=len(catalog))
+
+
+# ============== Admin Endpoints ==============
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Recent request profile captures, newest first"""
+    _require_admin(x_admin_token)
+    return {"profiles": profile_store.list(), **profile_store.stats()}
+
+
+@app.get("/admin/profiles/{capture_id}")
+async def download_profile(
+    capture_id: str,
+    format: str = "pstats",
+    sort: str = "cumulative",
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Download one capture
+    
+    format=pstats (default) returns a file for pstats/snakeviz;
+    format=text returns the top functions, ordered by sort.
+    """
+    _require_admin(x_admin_token)
+    capture = profile_store.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "text":
+        try:
+            return PlainTextResponse(capture.text(sort))
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+    return Response(
+        content=capture.dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.prof"'}
+    )
+
+
+# ============== Startup ==============
+
+# Used for warmup when no catalog is registered
+WARMUP_EXERCISES = [
+    {"name": f"Warmup {muscle}", "muscle_group": muscle, "equipment": "none", "difficulty": "beginner"}
+    for muscle in ("chest", "back", "shoulders", "biceps", "triceps", "legs", "core")
+]
+
+
+def _warmup():
+    """One throwaway plan through the generator and response encoder, and Pillow"""
+    catalog = catalog_registry.current
+    plan = generator.generate_plan(
+        profile=ProfileData(
+            goal="maintenance", level="beginner", days_per_week=3,
+            session_minutes=45, equipment="none"
+        ).model_dump(),
+        exercises=catalog.index if catalog is not None else WARMUP_EXERCISES,
+        week_start="2026-01-05",
+        seed=0
+    )
+    dumps(plan_content(plan))
+    chat_handler.image_preprocessor.warm()
+
+
+async def _initialize():
+    """Build the Gemini model and warm up, off the event loop"""
+    try:
+        await asyncio.to_thread(gemini_client.initialize)
+        startup_state["model_init_sec"] = gemini_client.model_init_seconds
+        if WARMUP_ENABLED:
+            start = time.perf_counter()
+            await asyncio.to_thread(_warmup)
+            startup_state["warmup_sec"] = round(time.perf_counter() - start, 3)
+            print(f"✓ Warmup done in {startup_state['warmup_sec']}s")
+    except Exception as e:
+        # Requests are still served (Mode A), but /ready stays 503
+        startup_state["failed"] = True
+        startup_state["error"] = str(e)
+        print(f"⚠ Startup initialization failed: {e}")
+        return
+    startup_state["ready"] = True
+
+
 # ============== Chat Models ==============
 
 class ChatMessage(BaseModel):
@@ -232,7 +709,11 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # With conversation_id, history is only needed to (re)start the pooled
+    # session: send it (possibly empty) for a new conversation or after a 409
     conversation_history: Optional[List[ChatMessage]] = None
+    conversation_id: Optional[int] = None
+    summary: Optional[str] = None  # Stored summary, prepended when (re)starting a session
 
 
 class ChatResponse(BaseModel):
@@ -245,8 +726,15 @@ class AnalysisResponse(BaseModel):
     data: Dict[str, Any]
 
 
+class FoodBatchResponse(BaseModel):
+    success: bool
+    items: List[AnalysisResponse]
+    total: Dict[str, Any]
+
+
 class SummarizeRequest(BaseModel):
     messages: List[ChatMessage]
+    previous_summary: Optional[str] = None  # Set to summarize only messages added since
 
 
 class SummarizeResponse(BaseModel):
@@ -260,33 +748,102 @@ class SummarizeResponse(BaseModel):
 async def chat(request: ChatRequest):
     """
     Process a chat message and return AI response
+    
+    Returns 409 when conversation_id has no live session and no
+    conversation_history was sent; retry with the history. The 409's
+    session_pool is false when pooling is off (several workers): send
+    the history with every turn then.
     """
     try:
         # Convert history to dict format
         history = None
-        if request.conversation_history:
+        if request.conversation_history is not None:
             history = [{"role": m.role, "content": m.content} for m in request.conversation_history]
         
-        response = await chat_handler.chat(request.message, history)
+        response = await chat_handler.chat(
+            request.message, history, request.conversation_id, request.summary
+        )
         
-        return ChatResponse(response=response, success=True)
+        with span('response_validation'):
+            return ChatResponse(response=response, success=True)
         
+    except SessionNotFound:
+        raise _session_expired()
     except Exception as e:
         print(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _session_expired() -> HTTPException:
+    """409 for a turn without history, saying whether sessions are pooled"""
+    return HTTPException(
+        status_code=409,
+        detail={"error": "session_expired", "session_pool": chat_handler.session_pool.enabled}
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Process a chat message and stream the AI response as Server-Sent Events
+    
+    Events:
+    - chunk: {"text": "..."} for each piece of the response
+    - done: {"response": "<full text>", "success": bool}, always sent last
+      so the caller can persist the assembled message
+    
+    Session handling matches /chat, including the 409 response.
+    """
+    history = None
+    if request.conversation_history is not None:
+        history = [{"role": m.role, "content": m.content} for m in request.conversation_history]
+    
+    if (request.conversation_id is not None and history is None
+            and request.conversation_id not in chat_handler.session_pool):
+        raise _session_expired()
+    
+    async def events():
+        parts = []
+        try:
+            async for text in chat_handler.chat_stream(
+                request.message, history, request.conversation_id, request.summary
+            ):
+                parts.append(text)
+                yield _sse_event("chunk", {"text": text})
+            
+            yield _sse_event("done", {"response": "".join(parts), "success": True})
+            
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            # Keep whatever was streamed; fall back to the error text otherwise
+            response = "".join(parts) or ChatHandler.ERROR_MESSAGE
+            yield _sse_event("done", {"response": response, "success": False})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/analyze_food", response_model=AnalysisResponse)
 async def analyze_food(image: UploadFile = File(...)):
     """
     Analyze food image and estimate calories
+    
+    Returns 413 if the upload exceeds FITAI_MAX_UPLOAD_BYTES.
     """
+    # Spooled upload file; preprocessing reads it in place
+    image_file = upload_source(image)
+    
     try:
-        # Read image data
-        image_data = await image.read()
-        
         # Analyze
-        result = await chat_handler.analyze_food(image_data)
+        result = await chat_handler.analyze_food(image_file)
         
         return AnalysisResponse(success=result.get("success", False), data=result)
         
@@ -295,17 +852,53 @@ async def analyze_food(image: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/analyze_food_batch", response_model=FoodBatchResponse)
+async def analyze_food_batch(images: List[UploadFile] = File(...)):
+    """
+    Analyze several photos of one meal
+    
+    Returns per-image results (same schema as /analyze_food, in upload
+    order) and the combined meal total. Returns 400 for more than
+    FITAI_MAX_BATCH_IMAGES images and 413 if any image exceeds
+    FITAI_MAX_UPLOAD_BYTES.
+    """
+    if len(images) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+    
+    # Spooled upload files; preprocessing reads them in place
+    image_files = [upload_source(image) for image in images]
+    
+    try:
+        result = await chat_handler.analyze_food_batch(image_files)
+        
+        items = [
+            AnalysisResponse(success=item.get("success", False), data=item)
+            for item in result["items"]
+        ]
+        return FoodBatchResponse(
+            success=any(item.success for item in items),
+            items=items,
+            total=result["total"]
+        )
+        
+    except Exception as e:
+        print(f"Food batch analysis error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/analyze_body", response_model=AnalysisResponse)
 async def analyze_body(image: UploadFile = File(...)):
     """
     Analyze body image and provide improvement suggestions
+    
+    Returns 413 if the upload exceeds FITAI_MAX_UPLOAD_BYTES.
     """
+    # Spooled upload file; preprocessing reads it in place
+    image_file = upload_source(image)
+    
     try:
-        # Read image data
-        image_data = await image.read()
-        
         # Analyze
-        result = await chat_handler.analyze_body(image_data)
+        result = await chat_handler.analyze_body(image_file)
         
         return AnalysisResponse(success=result.get("success", False), data=result)
         
@@ -318,12 +911,17 @@ async def analyze_body(image: UploadFile = File(...)):
 async def summarize_conversation(request: SummarizeRequest):
     """
     Summarize a conversation
+    
+    With previous_summary, messages should hold only the messages added
+    since that summary; the summary is updated incrementally. success is
+    false when no summary could be made, so callers keep their old one.
     """
     try:
         messages = [{"role": m.role, "content": m.content} for m in request.messages]
-        summary = await chat_handler.summarize_conversation(messages)
+        summary = await chat_handler.summarize_conversation(messages, request.previous_summary)
+        success = summary not in (ChatHandler.SUMMARY_UNAVAILABLE, ChatHandler.SUMMARY_ERROR)
         
-        return SummarizeResponse(summary=summary, success=True)
+        return SummarizeResponse(summary=summary, success=success)
         
     except Exception as e:
         print(f"Summarize error: {e}")
@@ -0,0 +1,268 @@
+"""
+FitAI - Metrics
+
+Dependency-free Prometheus-style counters, gauges and histograms, the
+service's metric definitions, and the ASGI middleware that records
+per-endpoint traffic. Rendered in the Prometheus text format by
+GET /metrics.
+
+Recording is a dict lookup, a bisect and a few additions under a lock
+per metric, cheap enough to leave on for every request.
+"""
+
+import time
+import bisect
+import operator
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTE_BUCKETS = tuple(1024 * 2 ** n for n in range(0, 15, 2))  # 1 KiB .. 16 MiB
+TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 2500, 3000, 4000, 6000, 8000, 16000, 32000)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_pairs(names: Sequence[str], values: Sequence[str]) -> List[str]:
+    return [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+
+
+def _braces(pairs: List[str]) -> str:
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        # label kwargs -> key tuple; itemgetter keeps this off the hot path
+        if len(self.labels) > 1:
+            self._key = operator.itemgetter(*self.labels)
+        elif self.labels:
+            self._key = lambda values, name=self.labels[0]: (values[name],)
+        else:
+            self._key = lambda values: ()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_braces(_label_pairs(self.labels, key))} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label set"""
+
+    type_name = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with sum and count per label set"""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        bounds = [f'le="{_format_value(bound)}"' for bound in self.buckets + (float('inf'),)]
+        for key, counts, total, count in items:
+            pairs = _label_pairs(self.labels, key)
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_braces(pairs + [bound])} {cumulative}"
+            labels = _braces(pairs)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """Ordered set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ============== Service Metrics ==============
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'fitai_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('path', 'method', 'status')
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    'fitai_http_request_duration_seconds', 'HTTP request latency until the response body is sent',
+    ('path', 'method')
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'fitai_http_requests_in_flight', 'HTTP requests currently being handled', ('path',)
+))
+GEMINI_CALLS = REGISTRY.register(Counter(
+    'fitai_gemini_calls_total', 'Model calls by call type and outcome (ok, error)',
+    ('call_type', 'outcome')
+))
+GEMINI_LATENCY = REGISTRY.register(Histogram(
+    'fitai_gemini_call_duration_seconds', 'Model call latency by call type, excluding queueing',
+    ('call_type',)
+))
+GEMINI_QUEUE = REGISTRY.register(Histogram(
+    'fitai_gemini_queue_seconds', 'Time spent waiting for a call type concurrency slot',
+    ('call_type',)
+))
+PLANS = REGISTRY.register(Counter(
+    'fitai_plans_total', 'Plans returned by endpoint and mode (A: rule-based, B: Gemini-enhanced)',
+    ('endpoint', 'mode')
+))
+PLAN_FALLBACKS = REGISTRY.register(Counter(
+    'fitai_plan_fallbacks_total', 'Plans that fell back to Mode A while Gemini was available',
+    ('endpoint',)
+))
+UPLOAD_BYTES = REGISTRY.register(Histogram(
+    'fitai_upload_bytes', 'Size of each uploaded image', buckets=BYTE_BUCKETS
+))
+CHAT_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    'fitai_chat_prompt_tokens', 'Prompt size of each chat turn in tokens (session context plus message)',
+    buckets=TOKEN_BUCKETS
+))
+PLAN_STORE_LOOKUPS = REGISTRY.register(Counter(
+    'fitai_plan_store_lookups_total', 'Precomputed plan lookups by outcome (hit, miss)',
+    ('outcome',)
+))
+
+
+def record_plan(endpoint: str, gemini_available: bool, enhanced: Optional[dict]):
+    """Count a plan as Mode A or Mode B; Mode A with Gemini up is a fallback"""
+    PLANS.inc(endpoint=endpoint, mode='B' if enhanced else 'A')
+    if gemini_available and not enhanced:
+        PLAN_FALLBACKS.inc(endpoint=endpoint)
+
+
+# ============== Middleware ==============
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight
+    requests per endpoint
+
+    Endpoints are labelled by the app's route paths; anything else
+    (404s, probes) is labelled "other" so label sets stay bounded.
+    Latency runs until the last body chunk, so streamed responses
+    are timed in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Optional[frozenset] = None
+
+    def _label(self, scope) -> str:
+        if self._paths is None:
+            routes = getattr(scope.get('app'), 'routes', [])
+            self._paths = frozenset(getattr(route, 'path', '') for route in routes)
+        path = scope['path']
+        return path if path in self._paths else 'other'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        path = self._label(scope)
+        method = scope['method']
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(path=path)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(path=path)
+            HTTP_LATENCY.observe(time.perf_counter() - start, path=path, method=method)
+            HTTP_REQUESTS.inc(path=path, method=method, status=str(status))
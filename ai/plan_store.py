@@ -0,0 +1,166 @@
+"""
+FitAI - Precomputed Plan Store
+
+On-disk store of plans computed ahead of time by precompute.py, so
+/generate_plan for the coming week is a lookup instead of generation
+plus a Gemini call. Plans are deterministic given user, week, profile
+and catalog, so a stored plan is served only when all four match.
+
+SQLite in WAL mode: the nightly job writes while service workers read.
+Plans are stored as zlib-compressed JSON, one row per (user, week).
+
+Settings (environment):
+- FITAI_PLAN_STORE: store file (default: ai/plan_store.sqlite3)
+"""
+
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    user_id INTEGER NOT NULL,
+    week_start TEXT NOT NULL,
+    catalog_version TEXT NOT NULL,
+    profile_hash TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    plan BLOB NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (user_id, week_start)
+) WITHOUT ROWID
+"""
+
+
+def default_store_path() -> str:
+    """FITAI_PLAN_STORE or ai/plan_store.sqlite3"""
+    return os.environ.get('FITAI_PLAN_STORE') or os.path.join(
+        os.path.dirname(__file__), 'plan_store.sqlite3'
+    )
+
+
+def profile_hash(profile: Dict[str, Any]) -> str:
+    """Hash of a normalized profile (ProfileData.model_dump())"""
+    payload = json.dumps(profile, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _encode(plan: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(plan, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data))
+
+
+class PlanStore:
+    """
+    Precomputed plans keyed by user and week
+
+    The service opens the store read-only, and only once the file
+    exists, so it can start before the first nightly run. A lookup is a
+    primary-key read (tens of microseconds), done inline.
+    """
+
+    def __init__(self, path: Optional[str] = None, readonly: bool = True):
+        self.path = path or default_store_path()
+        self.readonly = readonly
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+        if self.readonly:
+            if not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            conn.commit()
+        self._conn = conn
+        return conn
+
+    def get(
+        self,
+        user_id: int,
+        week_start: str,
+        catalog_version: str,
+        profile_key: str
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Stored plan and its mode ('A' or 'B') if it matches, else None"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT catalog_version, profile_hash, mode, plan FROM plans"
+                    " WHERE user_id = ? AND week_start = ?",
+                    (user_id, week_start)
+                ).fetchone() if conn is not None else None
+            except sqlite3.Error as e:
+                print(f"⚠ Plan store lookup failed: {e}")
+                row = None
+
+        if row is None or row[0] != catalog_version or row[1] != profile_key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _decode(row[3]), row[2]
+
+    def done_keys(
+        self,
+        week_start: str,
+        catalog_version: str,
+        mode: Optional[str] = None
+    ) -> Set[Tuple[int, str]]:
+        """(user_id, profile_hash) of plans already stored for a week and catalog, of mode if given"""
+        conn = self._connect()
+        if conn is None:
+            return set()
+        sql = "SELECT user_id, profile_hash FROM plans WHERE week_start = ? AND catalog_version = ?"
+        params = (week_start, catalog_version)
+        if mode is not None:
+            sql += " AND mode = ?"
+            params += (mode,)
+        return set(conn.execute(sql, params))
+
+    def put_many(self, rows: Iterable[Tuple[int, str, str, str, str, Dict[str, Any]]]):
+        """
+        Store (user_id, week_start, catalog_version, profile_hash, mode, plan)
+        rows in one transaction, replacing earlier plans for the same week
+        """
+        conn = self._connect()
+        with self._lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO plans"
+                " (user_id, week_start, catalog_version, profile_hash, mode, plan)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(*row[:5], _encode(row[5])) for row in rows]
+            )
+
+    def prune(self, before_week: str) -> int:
+        """Delete plans for weeks before before_week; returns rows deleted"""
+        conn = self._connect()
+        with self._lock, conn:
+            return conn.execute("DELETE FROM plans WHERE week_start < ?", (before_week,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'available': self._conn is not None or os.path.exists(self.path),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
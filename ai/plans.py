@@ -0,0 +1,33 @@
+"""
+FitAI - Plan Helpers
+
+Seeding, Gemini enhancement and the response shape of generated plans,
+shared by the service (main.py) and the precompute job (precompute.py)
+so a precomputed plan is exactly what /generate_plan would return.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def plan_seed(seed_string: str) -> int:
+    """Deterministic generator seed from a user/week string"""
+    return int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16)
+
+
+def apply_enhancement(plan: Dict[str, Any], enhanced: Optional[Dict[str, Any]]):
+    """Replace plan principles/notes with Gemini output when present"""
+    if enhanced:
+        plan['principles'] = enhanced.get('principles', plan['principles'])
+        plan['notes'] = enhanced.get('notes', plan['notes'])
+
+
+def plan_content(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """plan with PlanResponse's top-level fields, in order"""
+    return {
+        'week_start': plan['week_start'],
+        'days': plan['days'],
+        'principles': plan['principles'],
+        'notes': plan['notes'],
+        'metadata': plan.get('metadata')
+    }
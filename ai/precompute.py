@@ -0,0 +1,215 @@
+"""
+FitAI - Plan Precompute Job
+
+Nightly job computing next week's plans for all active users into the
+plan store (plan_store.py), so Monday-morning /generate_plan calls for
+the catalog are lookups. Each plan is exactly what /generate_plan would
+return: the same seed, the rule-based generator on the batch process
+pool, and Gemini enhancement when it is available.
+
+Input is a JSONL dump of active users, one object per line:
+    {"user_id": 42, "profile": {"goal": "muscle_gain", "level": ..., ...}}
+
+Runs are resumable: plans already stored for the week, catalog and
+profile are skipped, and results are committed per batch, so an
+interrupted run continues where it stopped. A changed profile is
+recomputed, and so is a Mode A plan when Gemini is available.
+
+Usage:
+    python precompute.py users.jsonl [--week-start 2026-01-05]
+        [--store plan_store.sqlite3] [--batch-size 500] [--no-enhance]
+        [--prune]
+
+Schedule it after the catalog is current, e.g. cron on Sunday night:
+    0 1 * * 0  cd /path/to/ai && python precompute.py /path/to/active_users.jsonl
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from batch import BatchPlanRunner
+from catalog import CatalogRegistry
+from gemini_client import GeminiClient
+from models import ProfileData
+from plan_store import PlanStore, profile_hash
+from plans import plan_seed, apply_enhancement, plan_content
+
+
+def next_week_start(today: Optional[date] = None) -> str:
+    """Monday after today"""
+    today = today or date.today()
+    return (today + timedelta(days=7 - today.weekday())).isoformat()
+
+
+def _read_users(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(line number, user, error) per non-empty line, the profile normalized as requests are"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                user = {
+                    'user_id': int(record['user_id']),
+                    'profile': ProfileData(**record['profile']).model_dump()
+                }
+                yield line_number, user, None
+            except Exception as e:
+                yield line_number, None, str(e)
+
+
+class Progress:
+    """Counts and throughput, printed once per batch"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.start = time.perf_counter()
+        self.computed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.enhanced = 0
+
+    @property
+    def processed(self) -> int:
+        return self.computed + self.skipped + self.failed
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.computed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.processed
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "-"
+        print(f"  {self.processed}/{self.total} ({self.processed / max(1, self.total):.0%}) "
+              f"computed {self.computed} (Mode B {self.enhanced}), skipped {self.skipped}, "
+              f"failed {self.failed}, {rate:.0f} plans/s, ETA {eta}", flush=True)
+
+
+async def _enhance(gemini_client: GeminiClient, plan: Dict[str, Any], profile: Dict[str, Any], seed: int) -> str:
+    """Apply Gemini enhancement to plan in place; returns the plan's mode"""
+    enhanced = await gemini_client.enhance_plan(plan=plan, profile=profile, variant_seed=seed)
+    apply_enhancement(plan, enhanced)
+    return 'B' if enhanced else 'A'
+
+
+async def _run_batch(
+    users: List[Dict[str, Any]],
+    exercises,
+    week_start: str,
+    catalog_version: str,
+    runner: BatchPlanRunner,
+    gemini_client: Optional[GeminiClient],
+    store: PlanStore,
+    progress: Progress
+):
+    """Generate, optionally enhance (gemini_client set) and store one batch"""
+    entries = [
+        {
+            'index': i,
+            'profile': user['profile'],
+            'week_start': week_start,
+            'seed': plan_seed(f"{user['user_id']}-{week_start}")
+        }
+        for i, user in enumerate(users)
+    ]
+    results = [result async for result in runner.run(exercises, entries, catalog_version)]
+
+    plans = {}
+    for result in results:
+        if 'error' in result:
+            user = users[result['index']]
+            print(f"⚠ User {user['user_id']}: {result['error']}")
+            progress.failed += 1
+        else:
+            plans[result['index']] = result['plan']
+
+    modes = dict.fromkeys(plans, 'A')
+    if gemini_client is not None:
+        # Concurrency is bounded by the Gemini client's per-call-type limits
+        indexes = list(plans)
+        enhanced = await asyncio.gather(*[
+            _enhance(gemini_client, plans[i], entries[i]['profile'], entries[i]['seed']) for i in indexes
+        ])
+        modes.update(zip(indexes, enhanced))
+
+    rows = []
+    for i, plan in plans.items():
+        user = users[i]
+        rows.append((
+            user['user_id'], week_start, catalog_version, profile_hash(user['profile']),
+            modes[i], plan_content(plan)
+        ))
+    store.put_many(rows)
+    progress.computed += len(rows)
+    progress.enhanced += sum(1 for mode in modes.values() if mode == 'B')
+
+
+async def run(args) -> Progress:
+    catalog = CatalogRegistry().current
+    if catalog is None:
+        raise SystemExit("✗ No exercise catalog - upload one (PUT /catalog) before precomputing")
+
+    gemini_client = None
+    if not args.no_enhance:
+        gemini_client = GeminiClient()
+        await asyncio.to_thread(gemini_client.initialize)
+        if not gemini_client.is_available():
+            gemini_client = None
+    enhance = gemini_client is not None
+    runner = BatchPlanRunner()
+    store = PlanStore(args.store, readonly=False)
+    # Mode A plans stored while Gemini was off are redone when enhancing
+    done = store.done_keys(args.week_start, catalog.version, mode='B' if enhance else None)
+    if args.prune:
+        print(f"✓ Pruned {store.prune(args.week_start)} plans of earlier weeks")
+
+    with open(args.users, 'r', encoding='utf-8') as f:
+        total = sum(1 for line in f if line.strip())
+    print(f"Precomputing week {args.week_start}: {total} users, catalog {catalog.version}, "
+          f"{len(done)} already stored, Gemini {'on' if enhance else 'off'}")
+
+    progress = Progress(total)
+    batch: List[Dict[str, Any]] = []
+    try:
+        for line_number, user, error in _read_users(args.users):
+            if error is not None:
+                print(f"⚠ Line {line_number}: {error}")
+                progress.failed += 1
+                continue
+            if (user['user_id'], profile_hash(user['profile'])) in done:
+                progress.skipped += 1
+                continue
+            batch.append(user)
+            if len(batch) >= args.batch_size:
+                await _run_batch(batch, catalog.index, args.week_start, catalog.version,
+                                 runner, gemini_client, store, progress)
+                batch = []
+                progress.report()
+        if batch:
+            await _run_batch(batch, catalog.index, args.week_start, catalog.version,
+                             runner, gemini_client, store, progress)
+        progress.report()
+    finally:
+        runner.shutdown()
+        store.close()
+
+    return progress
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute next week's plans into the plan store")
+    parser.add_argument('users', help='JSONL file of {"user_id", "profile"} objects')
+    parser.add_argument('--week-start', default=next_week_start(), help='Monday to plan (default: next Monday)')
+    parser.add_argument('--store', help='plan store file (default: FITAI_PLAN_STORE or ai/plan_store.sqlite3)')
+    parser.add_argument('--batch-size', type=int, default=500, help='users per committed batch')
+    parser.add_argument('--no-enhance', action='store_true', help='store Mode A plans without Gemini calls')
+    parser.add_argument('--prune', action='store_true', help='delete plans of earlier weeks')
+    args = parser.parse_args()
+
+    progress = asyncio.run(run(args))
+    print(f"✓ Done in {time.perf_counter() - progress.start:.1f}s: {progress.computed} computed, "
+          f"{progress.skipped} skipped, {progress.failed} failed")
+    sys.exit(1 if progress.failed else 0)
@@ -0,0 +1,230 @@
+"""
+FitAI - Request Profiling
+
+Opt-in cProfile capture of single requests, for diagnosing slow plan
+generation in production without redeploying. A request is profiled
+when it carries the admin token in the X-FitAI-Profile header, or at
+random at the configured sample rate. The profile spans the whole
+request: Pydantic request/response validation, the generator, and the
+thread-pool work behind Gemini calls, whose queueing and call times are
+also listed per call. Recent captures are kept in a bounded ring and
+downloaded from /admin/profiles.
+
+Settings (environment):
+- FITAI_ADMIN_TOKEN: token for the profile header and admin endpoints
+  (unset: header-triggered capture and admin endpoints are disabled)
+- FITAI_PROFILE_SAMPLE_RATE: fraction of requests profiled (default: 0)
+- FITAI_PROFILE_CAPTURES: captures kept (default: 20)
+"""
+
+import io
+import os
+import hmac
+import time
+import uuid
+import random
+import marshal
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+ADMIN_TOKEN = os.environ.get('FITAI_ADMIN_TOKEN') or None
+PROFILE_SAMPLE_RATE = float(os.environ.get('FITAI_PROFILE_SAMPLE_RATE', 0) or 0)
+PROFILE_CAPTURES = int(os.environ.get('FITAI_PROFILE_CAPTURES', 0)) or 20
+
+PROFILE_HEADER = b'x-fitai-profile'
+PROFILE_ID_HEADER = b'x-fitai-profile-id'
+
+# Capture of the request being handled, if it is being profiled
+current_capture: contextvars.ContextVar[Optional['ProfileCapture']] = contextvars.ContextVar(
+    'current_capture', default=None
+)
+
+
+def check_admin_token(token: Optional[str]) -> bool:
+    """True when token matches FITAI_ADMIN_TOKEN (never when it is unset)"""
+    return bool(ADMIN_TOKEN and token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class ProfileCapture:
+    """Profile and timings of one request"""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started = datetime.utcnow().isoformat()
+        self.duration_ms = 0.0
+        self.status: Optional[int] = None
+        self.calls: List[Dict[str, Any]] = []
+        self.stats: Optional[pstats.Stats] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+
+    def wrap(self, func: Callable) -> Callable:
+        """func, profiled in whichever worker thread runs it"""
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # 3.12+: the request profiler already sees every thread
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._thread_profiles.append(profile)
+        return profiled
+
+    def record_call(self, call_type: str, queue_sec: float, call_sec: float, ok: bool):
+        """Timing of a Gemini client call made for this request"""
+        self.calls.append({
+            'call_type': call_type,
+            'queue_ms': round(queue_sec * 1000, 2),
+            'call_ms': round(call_sec * 1000, 2),
+            'ok': ok
+        })
+
+    def finish(self, profile: cProfile.Profile, duration_sec: float):
+        self.duration_ms = round(duration_sec * 1000, 2)
+        self.stats = pstats.Stats(profile)
+        for thread_profile in self._thread_profiles:
+            self.stats.add(thread_profile)
+        self._thread_profiles = []
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'trigger': self.trigger,
+            'started': self.started,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'calls': self.calls
+        }
+
+    def dump(self) -> bytes:
+        """Profile in the pstats file format (what Profile.dump_stats writes)"""
+        return marshal.dumps(self.stats.stats)
+
+    def text(self, sort: str = 'cumulative', limit: int = 60) -> str:
+        """Human-readable pstats report"""
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        stats.add(self.stats)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+class ProfileStore:
+    """Ring of the most recent captures"""
+
+    def __init__(self, max_captures: int = PROFILE_CAPTURES):
+        self._captures: "deque[ProfileCapture]" = deque(maxlen=max(1, max_captures))
+        self._lock = threading.Lock()
+        self.captured = 0
+        self.skipped_busy = 0
+
+    def add(self, capture: ProfileCapture):
+        with self._lock:
+            self._captures.append(capture)
+            self.captured += 1
+
+    def get(self, capture_id: str) -> Optional[ProfileCapture]:
+        with self._lock:
+            for capture in self._captures:
+                if capture.id == capture_id:
+                    return capture
+        return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Capture summaries, newest first"""
+        with self._lock:
+            return [capture.info() for capture in reversed(self._captures)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': ADMIN_TOKEN is not None or PROFILE_SAMPLE_RATE > 0,
+            'sample_rate': PROFILE_SAMPLE_RATE,
+            'stored': len(self._captures),
+            'max_captures': self._captures.maxlen,
+            'captured': self.captured,
+            'skipped_busy': self.skipped_busy
+        }
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running selected requests under cProfile
+
+    One request is profiled at a time (the profiler is per process);
+    requests selected while another capture runs are not profiled.
+    Other requests interleaved on the event loop during a capture
+    appear in its profile too. Profiled responses carry the capture
+    id in an X-FitAI-Profile-Id header. /admin paths are never profiled.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._busy = threading.Lock()
+
+    def _trigger(self, scope) -> Optional[str]:
+        for name, value in scope['headers']:
+            if name == PROFILE_HEADER:
+                if check_admin_token(value.decode('latin-1')):
+                    return 'header'
+                break
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith('/admin'):
+            return await self.app(scope, receive, send)
+
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+        if not self._busy.acquire(blocking=False):
+            self.store.skipped_busy += 1
+            return await self.app(scope, receive, send)
+
+        capture = ProfileCapture(scope['method'], scope['path'], trigger)
+        profile = cProfile.Profile()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                capture.status = message['status']
+                message = {
+                    **message,
+                    'headers': [*message.get('headers', []), (PROFILE_ID_HEADER, capture.id.encode())]
+                }
+            await send(message)
+
+        token = current_capture.set(capture)
+        start = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this process
+            current_capture.reset(token)
+            self._busy.release()
+            self.store.skipped_busy += 1
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            current_capture.reset(token)
+            self._busy.release()
+            capture.finish(profile, time.perf_counter() - start)
+            self.store.add(capture)
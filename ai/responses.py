@@ -0,0 +1,38 @@
+"""
+FitAI - Fast JSON Responses
+
+Plan endpoints send generator output straight to JSON instead of
+validating it into PlanResponse and then having FastAPI check and
+serialize the model again. The generator already builds plans in
+PlanResponse's shape and field order, so plan_content() (plans.py)
+only fixes the top level (field order, metadata defaulting to null)
+and the bytes match what FastAPI sends for the model.
+
+Encoded with orjson when installed, else pydantic_core's serializer
+(both compact, UTF-8, no ASCII escaping).
+"""
+
+from typing import Any, Dict
+
+import pydantic_core
+from fastapi.responses import Response
+
+from plans import plan_content
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return pydantic_core.to_json(obj)
+
+
+def plan_json_response(plan: Dict[str, Any]) -> Response:
+    """plan serialized as FastAPI would serialize PlanResponse(**plan)"""
+    return Response(content=dumps(plan_content(plan)), media_type='application/json')
@@ -0,0 +1,104 @@
+"""
+FitAI - Multi-worker Launcher
+
+Runs the AI service under uvicorn with several worker processes. The
+exercise catalog is loaded and encoded once here, in the parent, into
+a compact memory-mapped file (shared_catalog.py); every worker maps
+that file read-only instead of parsing and indexing its own copy.
+
+Everything else is per worker: the chat session pool, the plan cache
+and the response caches. Requests are not routed by conversation, so
+consecutive chat turns can land on different workers; with more than
+one worker, chat session pooling is turned off and every turn is
+answered from the history sent with it. A turn without history gets
+a 409 with "session_pool": false, after which the backend sends the
+history up front. Caches just warm up per worker.
+
+Usage:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8001]
+        [--no-shared-catalog]
+
+Settings (environment):
+- FITAI_WORKERS: default worker count (default: CPU count)
+- FITAI_SHARED_CATALOG_DIR: where the shared file is written
+  (default: /dev/shm when present, else the temp directory)
+- FITAI_CHAT_SESSION_POOL: set to 0 here for the workers when
+  --workers > 1
+- FITAI_BATCH_WORKERS: batch plan processes per worker; with
+  --workers > 1 defaults to CPU count / workers (at least 1) so the
+  workers' pools together don't oversubscribe the CPUs
+"""
+
+import os
+import json
+import argparse
+import tempfile
+from typing import Optional
+
+import uvicorn
+
+from catalog import ExerciseCatalog, default_catalog_path
+from shared_catalog import write_catalog
+
+
+def _shared_dir() -> str:
+    configured = os.environ.get('FITAI_SHARED_CATALOG_DIR')
+    if configured:
+        return configured
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def prepare_shared_catalog() -> Optional[str]:
+    """Encode the persisted catalog for the workers; None without one"""
+    path = default_catalog_path()
+    if not os.path.exists(path):
+        print("ℹ No exercise catalog file - workers start without a shared catalog")
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        exercises = json.load(f)
+    version = ExerciseCatalog.compute_version(exercises)
+
+    shared_path = os.path.join(_shared_dir(), f"fitai-catalog-{version}-{os.getpid()}.bin")
+    size = write_catalog(exercises, version, shared_path)
+    print(f"✓ Shared exercise catalog {version}: {len(exercises)} exercises, "
+          f"{size / (1024 * 1024):.1f} MB at {shared_path}")
+    return shared_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the FitAI AI service with several workers")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('FITAI_WORKERS', 0)) or os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--no-shared-catalog', action='store_true',
+                        help='let each worker load its own copy of the catalog')
+    args = parser.parse_args()
+
+    shared_path = None if args.no_shared_catalog else prepare_shared_catalog()
+    if shared_path:
+        # Inherited by the workers; CatalogRegistry maps it on import
+        os.environ['FITAI_SHARED_CATALOG'] = shared_path
+    if args.workers > 1:
+        # A pooled session is only right on the worker that saw every turn
+        os.environ['FITAI_CHAT_SESSION_POOL'] = '0'
+        print(f"ℹ {args.workers} workers - chat session pooling off, chat turns need their history")
+        # Each worker has its own batch pool; share the CPUs between them
+        os.environ.setdefault('FITAI_BATCH_WORKERS', str(max(1, (os.cpu_count() or 1) // args.workers)))
+
+    try:
+        uvicorn.run(
+            'main:app',
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            app_dir=os.path.dirname(os.path.abspath(__file__))
+        )
+    finally:
+        if shared_path and os.path.exists(shared_path):
+            os.remove(shared_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+FitAI - Shared Exercise Catalog
+
+Compact, memory-mapped encoding of the exercise catalog and its
+ExerciseIndex views. serve.py writes it once in the parent process;
+each worker maps the file read-only, so all workers share the same
+physical pages instead of each holding its own dicts (which
+copy-on-write after fork would not keep shared either, as reference
+counting writes to every object).
+
+File layout (little-endian, sections 8-byte aligned):
+- b'FITCAT01', uint32 header length, JSON header
+- strings: UTF-8 names, descriptions and full exercise JSON
+- records: 6 x uint32 per exercise (name, description, JSON; offset
+  and length each)
+- ids: uint32 exercise ids of every (equipment, level, muscle) bucket,
+  in catalog order
+"""
+
+import os
+import json
+import mmap
+import array
+import struct
+import functools
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+
+from generator import ExerciseIndex, EQUIPMENT_LEVELS, DIFFICULTY_LEVELS
+
+MAGIC = b'FITCAT01'
+RECORD_FIELDS = 6
+NO_DESCRIPTION = 0xFFFFFFFF  # description key missing
+NULL_DESCRIPTION = 0xFFFFFFFE  # description is None
+DECODE_CACHE_SIZE = 8192  # decoded exercises kept per process
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_catalog(exercises: List[Dict[str, Any]], version: str, path: str) -> int:
+    """
+    Encode exercises and their index views to path
+
+    Buckets match ExerciseIndex exactly, so plans are identical.
+    Returns the file size.
+    """
+    strings = bytearray()
+    records = array.array('I')
+
+    def add_string(text: str):
+        data = text.encode('utf-8')
+        records.extend((len(strings), len(data)))
+        strings.extend(data)
+
+    for ex in exercises:
+        add_string(ex['name'])
+        if 'description' not in ex:
+            records.extend((0, NO_DESCRIPTION))
+        elif ex['description'] is None:
+            records.extend((0, NULL_DESCRIPTION))
+        else:
+            add_string(ex['description'])
+        add_string(json.dumps(ex, ensure_ascii=False, separators=(',', ':')))
+
+    index = ExerciseIndex(exercises)
+    positions = {id(ex): i for i, ex in enumerate(exercises)}
+    ids = array.array('I')
+    views: Dict[str, Dict[str, List[int]]] = {}
+    for equipment in EQUIPMENT_LEVELS:
+        for level in DIFFICULTY_LEVELS:
+            buckets = views[f"{equipment}|{level}"] = {}
+            for muscle, bucket in index.view(equipment, level).items():
+                buckets[muscle] = [len(ids), len(bucket)]
+                ids.extend(positions[id(ex)] for ex in bucket)
+
+    # Offsets are relative to the data start, so the header can be sized freely
+    strings_offset = 0
+    records_offset = _align(len(strings))
+    ids_offset = _align(records_offset + records.itemsize * len(records))
+    header = json.dumps({
+        'version': version,
+        'count': len(exercises),
+        'strings': strings_offset,
+        'records': records_offset,
+        'ids': ids_offset,
+        'id_count': len(ids),
+        'views': views
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = _align(len(MAGIC) + 4 + len(header))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header)) + header)
+        f.write(b'\0' * (data_start - f.tell()))
+        f.write(strings)
+        f.write(b'\0' * (data_start + records_offset - f.tell()))
+        f.write(records.tobytes())
+        f.write(b'\0' * (data_start + ids_offset - f.tell()))
+        f.write(ids.tobytes())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+class _Bucket(Sequence):
+    """Read-only list of exercises backed by an id slice of the mapping"""
+
+    __slots__ = ('_index', '_ids')
+
+    def __init__(self, index: 'MappedExerciseIndex', ids: memoryview):
+        self._index = index
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._index.exercise(j) for j in self._ids[i]]
+        return self._index.exercise(self._ids[i])
+
+
+class MappedExerciseIndex(ExerciseIndex):
+    """
+    ExerciseIndex read from a file written by write_catalog
+
+    Buckets are sequences over the mapped file; each access returns a
+    small dict with the fields plans use (name, description), from a
+    bounded per-process cache of decoded exercises. The full exercise
+    list is decoded only if .exercises is read. Pickles by path, so
+    batch worker processes map the same file.
+    """
+
+    def __init__(self, path: str, cache_size: int = DECODE_CACHE_SIZE):
+        self.path = path
+        self.exercise = functools.lru_cache(maxsize=cache_size)(self._decode)
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a shared exercise catalog: {path}")
+
+        header_length = struct.unpack_from('<I', self._map, len(MAGIC))[0]
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._map[header_start:header_start + header_length])
+        data_start = _align(header_start + header_length)
+
+        self.version: str = header['version']
+        self._count: int = header['count']
+        self._strings = data_start + header['strings']
+        data = memoryview(self._map)
+        records_start = data_start + header['records']
+        self._records = data[records_start:records_start + self._count * RECORD_FIELDS * 4].cast('I')
+        ids_start = data_start + header['ids']
+        ids = data[ids_start:ids_start + header['id_count'] * 4].cast('I')
+
+        self._views: Dict[tuple, Dict[str, _Bucket]] = {}
+        for key, buckets in header['views'].items():
+            equipment, level = key.split('|')
+            self._views[(equipment, level)] = {
+                muscle: _Bucket(self, ids[start:start + length])
+                for muscle, (start, length) in buckets.items()
+            }
+        self._exercises: Optional[List[Dict[str, Any]]] = None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._map[start:start + length].decode('utf-8')
+
+    def _decode(self, i: int) -> Dict[str, Any]:
+        """Name and description of exercise i"""
+        base = i * RECORD_FIELDS
+        records = self._records
+        exercise = {'name': self._string(records[base], records[base + 1])}
+        description_length = records[base + 3]
+        if description_length == NULL_DESCRIPTION:
+            exercise['description'] = None
+        elif description_length != NO_DESCRIPTION:
+            exercise['description'] = self._string(records[base + 2], description_length)
+        return exercise
+
+    @property
+    def exercises(self) -> List[Dict[str, Any]]:
+        """Full exercise dicts, decoded on first use"""
+        if self._exercises is None:
+            records = self._records
+            self._exercises = [
+                json.loads(self._string(records[i * RECORD_FIELDS + 4], records[i * RECORD_FIELDS + 5]))
+                for i in range(self._count)
+            ]
+        return self._exercises
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __reduce__(self):
+        return (MappedExerciseIndex, (self.path,))
@@ -0,0 +1,87 @@
+"""
+FitAI - Request Timing
+
+Tiny span API behind the Server-Timing header. The route handler
+(TimedRoute in main.py) opens a Timings for the request with
+timed_request(); code anywhere below it (generator, Gemini client,
+endpoints) wraps work in span(name), which is a no-op outside a timed
+request. Repeated spans of one name add up.
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+SPAN_DESCRIPTIONS = {
+    'validate': 'request validation',
+    'catalog': 'exercise list conversion',
+    'plan_store': 'precomputed plan lookup',
+    'plan_cache': 'memoized plan lookup',
+    'filter': 'exercise filtering',
+    'days': 'day generation',
+    'enhance': 'Gemini enhancement',
+    'image_preprocess': 'image preprocessing',
+    'response_validation': 'response model validation',
+    'serialize': 'serialization',
+    'total': 'total',
+}
+
+_current: contextvars.ContextVar[Optional['Timings']] = contextvars.ContextVar(
+    'request_timings', default=None
+)
+
+
+class Timings:
+    """Accumulated span durations of one request"""
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        """Record the current time under name"""
+        self.marks[name] = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        entries = []
+        for name, seconds in self.spans.items():
+            entry = f"{name};dur={seconds * 1000:.2f}"
+            description = SPAN_DESCRIPTIONS.get(name)
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+@contextmanager
+def timed_request() -> Iterator[Timings]:
+    """Collect spans into a new Timings for the enclosed request"""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block into the current request's timings"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
@@ -0,0 +1,79 @@
+"""
+FitAI - Upload Limits
+
+Caps image upload size. Request bodies over the limit are rejected with
+413 while they are still arriving, instead of after being spooled and
+read into memory in full.
+
+Settings (environment):
+- FITAI_MAX_UPLOAD_BYTES: largest accepted upload body (default: 16 MiB)
+"""
+
+import os
+from typing import BinaryIO, Iterable
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from metrics import UPLOAD_BYTES
+
+MAX_UPLOAD_BYTES = int(os.environ.get('FITAI_MAX_UPLOAD_BYTES', 0)) or 16 * 1024 * 1024
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"Upload exceeds the {max_bytes} byte limit"
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping request bodies on upload paths
+
+    Rejects up front when Content-Length is over the limit; otherwise
+    counts body chunks as they are received, so chunked uploads are cut
+    off at the limit rather than spooled in full.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope['headers']:
+            if name == b'content-length':
+                if value.isdigit() and int(value) > self.max_bytes:
+                    response = JSONResponse({'detail': _too_large(self.max_bytes)}, status_code=413)
+                    return await response(scope, receive, send)
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=_too_large(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_source(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> BinaryIO:
+    """
+    Spooled file behind an upload, checked against the size limit
+
+    Passed to preprocessing as is, so large uploads are decoded from the
+    spooled file rather than copied into memory first.
+    """
+    if upload.size is not None:
+        UPLOAD_BYTES.observe(upload.size)
+        if upload.size > max_bytes:
+            raise HTTPException(status_code=413, detail=_too_large(max_bytes))
+
+    upload.file.seek(0)
+    return upload.file
@@ -10,6 +10,7 @@
 require_once __DIR__ . '/../config.php';
 require_once __DIR__ . '/../db.php';
 require_once __DIR__ . '/middleware.php';
+require_once __DIR__ . '/../utils/AIService.php';
 
 handleCorsPreflightRequest();
 
@@ -113,6 +114,9 @@ function handleSaveExercise()
         $message = 'Đã thêm bài tập mới';
     }
 
+    // AI service re-uploads the catalog on the next plan request
+    AIService::invalidateCatalog();
+
     jsonResponse([
         'success' => true,
         'message' => $message,
@@ -133,6 +137,7 @@ function handleDeleteExercise()
     }
 
     Database::delete('DELETE FROM exercises WHERE id = ?', [$exerciseId]);
+    AIService::invalidateCatalog();
 
     jsonResponse([
         'success' => true,
@@ -6,6 +6,10 @@
  * 
  * Sends a message to PT AI and returns response
  * Handles conversation management with 150 message limit
+ * 
+ * The conversation summary is kept up to date in small incremental
+ * steps after responses are sent, so the 150-message rollover only
+ * has to fold in the last few messages.
  */
 
 require_once __DIR__ . '/../config.php';
@@ -36,7 +40,7 @@ if (empty($message)) {
 try {
     // Get or create active conversation
     $conversation = Database::fetchOne(
-        'SELECT id, message_count FROM chat_conversations 
+        'SELECT id, message_count, summary, summarized_message_id FROM chat_conversations 
          WHERE user_id = ? AND is_active = TRUE 
          ORDER BY updated_at DESC LIMIT 1',
         [$userId]
@@ -49,26 +53,20 @@ try {
             [$userId, 'Cuộc trò chuyện mới']
         );
         $messageCount = 0;
+        $summary = null;
+        $summarizedMessageId = 0;
     } else {
         $conversationId = $conversation['id'];
         $messageCount = $conversation['message_count'];
+        $summary = $conversation['summary'];
+        $summarizedMessageId = (int) $conversation['summarized_message_id'];
     }
 
     // Check if we need to summarize and create new conversation
     if ($messageCount >= 150) {
-        // Get messages for summarization
-        $messages = Database::fetchAll(
-            'SELECT role, content FROM chat_messages 
-             WHERE conversation_id = ? ORDER BY created_at',
-            [$conversationId]
-        );
-
-        // Call AI to summarize
-        $summaryResponse = callAIService('/summarize', [
-            'messages' => $messages
-        ]);
-
-        $summary = $summaryResponse['summary'] ?? 'Tóm tắt cuộc trò chuyện';
+        // Fold the messages since the last background step into the summary
+        $step = updateRollingSummary($conversationId, $summary, $summarizedMessageId);
+        $summary = $step['summary'] ?? $summary ?? 'Tóm tắt cuộc trò chuyện';
 
         // Update old conversation
         Database::update(
@@ -82,28 +80,47 @@ try {
             [$userId, 'Cuộc trò chuyện mới (tiếp nối)']
         );
         $messageCount = 0;
+        $summary = null;
+        $summarizedMessageId = 0;
     }
 
-    // Get conversation history for context (last 20 messages)
-    $history = Database::fetchAll(
-        'SELECT role, content FROM chat_messages 
-         WHERE conversation_id = ? 
-         ORDER BY created_at DESC LIMIT 20',
-        [$conversationId]
-    );
-    $history = array_reverse($history);
-
     // Save user message
-    Database::insert(
+    $userMessageId = Database::insert(
         'INSERT INTO chat_messages (conversation_id, role, content, message_type) VALUES (?, ?, ?, ?)',
         [$conversationId, 'user', $message, 'text']
     );
 
-    // Call AI service
-    $aiResponse = callAIService('/chat', [
+    // AI service keeps a live session per conversation, so only the new
+    // message is sent. History is needed for a new conversation (empty)
+    // or when the service no longer has the session (HTTP 409), and on
+    // every turn while the service runs without session pooling.
+    $chatRequest = [
         'message' => $message,
-        'conversation_history' => $history
-    ]);
+        'conversation_id' => $conversationId
+    ];
+    if ((int) $messageCount === 0) {
+        $chatRequest['conversation_history'] = [];
+        $chatRequest['summary'] = getPreviousSummary($userId);
+    } elseif (isChatSessionPoolOff()) {
+        $chatRequest['conversation_history'] = getChatHistory($conversationId, $userMessageId);
+        $chatRequest['summary'] = getPreviousSummary($userId);
+    }
+
+    try {
+        $aiResponse = callAIService('/chat', $chatRequest, $errorDetail);
+    } catch (Exception $e) {
+        if ($e->getCode() !== 409) {
+            throw $e;
+        }
+        if (($errorDetail['session_pool'] ?? true) === false) {
+            markChatSessionPoolOff();
+        }
+
+        $chatRequest['conversation_history'] = getChatHistory($conversationId, $userMessageId);
+        $chatRequest['summary'] = getPreviousSummary($userId);
+
+        $aiResponse = callAIService('/chat', $chatRequest);
+    }
 
     $responseText = $aiResponse['response'] ?? 'Xin lỗi, có lỗi xảy ra.';
 
@@ -119,6 +136,33 @@ try {
         [$conversationId]
     );
 
+    // Refresh the rolling summary once enough new messages have piled up,
+    // after the response has been sent. Without a way to release the
+    // response early (mod_php, php -S) the step is skipped rather than
+    // delaying the reply; a later request picks it up, and the 150-message
+    // rollover folds in whatever is left.
+    register_shutdown_function(function () use ($conversationId, $summary, $summarizedMessageId) {
+        if (function_exists('fastcgi_finish_request')) {
+            fastcgi_finish_request();
+        } elseif (function_exists('litespeed_finish_request')) {
+            litespeed_finish_request();
+        } else {
+            return;
+        }
+
+        try {
+            $pending = Database::fetchOne(
+                'SELECT COUNT(*) AS count FROM chat_messages WHERE conversation_id = ? AND id > ?',
+                [$conversationId, $summarizedMessageId]
+            );
+            if ((int) $pending['count'] >= CHAT_SUMMARY_STEP) {
+                updateRollingSummary($conversationId, $summary, $summarizedMessageId, CHAT_SUMMARY_STEP * 2);
+            }
+        } catch (Exception $e) {
+            error_log('Chat summary error: ' . $e->getMessage());
+        }
+    });
+
     jsonResponse([
         'success' => true,
         'response' => $responseText,
@@ -131,10 +175,114 @@ try {
     errorResponse('Failed to process chat', 500);
 }
 
+/**
+ * Fold messages after $afterId into the conversation's rolling summary
+ * 
+ * Only the new messages (up to $limit) are sent along with the current
+ * summary. Returns the updated summary and last summarized message id,
+ * or null if there was nothing new or the AI service could not summarize.
+ */
+function updateRollingSummary(int $conversationId, ?string $summary, int $afterId, ?int $limit = null): ?array
+{
+    $sql = 'SELECT id, role, content FROM chat_messages 
+            WHERE conversation_id = ? AND id > ? ORDER BY id';
+    if ($limit !== null) {
+        $sql .= ' LIMIT ' . (int) $limit;
+    }
+    $messages = Database::fetchAll($sql, [$conversationId, $afterId]);
+
+    if (empty($messages)) {
+        return null;
+    }
+
+    $response = callAIService('/summarize', [
+        'messages' => array_map(function ($m) {
+            return ['role' => $m['role'], 'content' => $m['content']];
+        }, $messages),
+        'previous_summary' => $summary
+    ]);
+
+    if (empty($response['success']) || empty($response['summary'])) {
+        return null;
+    }
+
+    $lastMessageId = (int) end($messages)['id'];
+
+    // Only advance from where this step started, so overlapping steps
+    // from concurrent requests don't overwrite each other
+    Database::update(
+        'UPDATE chat_conversations SET summary = ?, summarized_message_id = ? 
+         WHERE id = ? AND summarized_message_id = ?',
+        [$response['summary'], $lastMessageId, $conversationId, $afterId]
+    );
+
+    return ['summary' => $response['summary'], 'summarized_message_id' => $lastMessageId];
+}
+
+/**
+ * Recent messages before $beforeId, oldest first
+ * 
+ * The AI service trims them to its token budget.
+ */
+function getChatHistory(int $conversationId, int $beforeId): array
+{
+    $history = Database::fetchAll(
+        'SELECT role, content FROM chat_messages 
+         WHERE conversation_id = ? AND id < ?
+         ORDER BY created_at DESC LIMIT 50',
+        [$conversationId, $beforeId]
+    );
+
+    return array_reverse($history);
+}
+
+/**
+ * Marker file: the AI service reported session pooling off
+ */
+function chatSessionPoolFile(): string
+{
+    return sys_get_temp_dir() . '/fitai_chat_session_pool_off';
+}
+
+/**
+ * Whether to send history with every turn
+ * 
+ * Set by a 409 saying pooling is off (AI service with several
+ * workers). The marker expires so a redeployed single-worker service
+ * is noticed again.
+ */
+function isChatSessionPoolOff(): bool
+{
+    $modified = @filemtime(chatSessionPoolFile());
+    return $modified !== false && time() - $modified < CHAT_SESSION_POOL_CHECK_SEC;
+}
+
+function markChatSessionPoolOff(): void
+{
+    @touch(chatSessionPoolFile());
+}
+
+/**
+ * Summary of the user's last closed conversation, for chat context
+ */
+function getPreviousSummary(int $userId): ?string
+{
+    $previous = Database::fetchOne(
+        'SELECT summary FROM chat_conversations 
+         WHERE user_id = ? AND is_active = FALSE AND summary IS NOT NULL 
+         ORDER BY updated_at DESC LIMIT 1',
+        [$userId]
+    );
+
+    return $previous ? $previous['summary'] : null;
+}
+
 /**
  * Call AI service endpoint
+ * 
+ * On an error response the decoded "detail" is left in $errorDetail.
  */
-function callAIService(string $endpoint, array $data): array
+function callAIService(string $endpoint, array $data, ?array &$errorDetail = null): array
 {
     $aiUrl = AI_SERVICE_URL . $endpoint;
     $ch = curl_init($aiUrl);
@@ -161,7 +309,11 @@ function callAIService(string $endpoint, array $data): array
     }
 
     if ($httpCode !== 200) {
-        throw new Exception('AI service error: HTTP ' . $httpCode);
+        $errorDetail = json_decode($response, true)['detail'] ?? null;
+        if (!is_array($errorDetail)) {
+            $errorDetail = null;
+        }
+        throw new Exception('AI service error: HTTP ' . $httpCode, $httpCode);
     }
 
     return json_decode($response, true) ?? [];
@@ -19,6 +19,9 @@ define('DB_PASS', 'nhanhoane@A123'); // Set your MySQL password
 // AI Service Configuration
 define('AI_SERVICE_URL', 'http://localhost:8001');
 define('AI_SERVICE_TIMEOUT', 30); // seconds
+define('AI_ADMIN_TOKEN', getenv('FITAI_ADMIN_TOKEN') ?: ''); // same as the AI service's FITAI_ADMIN_TOKEN, for catalog uploads
+define('CHAT_SUMMARY_STEP', 20); // new messages per background summary update
+define('CHAT_SESSION_POOL_CHECK_SEC', 600); // recheck AI session pooling after this long
 
 // Session Configuration
 define('SESSION_LIFETIME', 86400); // 24 hours in seconds
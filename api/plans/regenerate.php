@@ -9,6 +9,7 @@
 
 require_once __DIR__ . '/../config.php';
 require_once __DIR__ . '/../db.php';
+require_once __DIR__ . '/../utils/AIService.php';
 
 // Only allow POST
 if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
@@ -40,15 +41,6 @@ if (!$profile || !$profile['goal'] || !$profile['level']) {
     errorResponse('Vui lòng hoàn thành hồ sơ trước', 400);
 }
 
-// Get available exercises from database
-$exercises = Database::fetchAll(
-    'SELECT name, muscle_group, equipment, difficulty, description
-     FROM exercises
-     WHERE equipment IN ("none", ?)
-     ORDER BY muscle_group, difficulty',
-    [$profile['equipment']]
-);
-
 // Prepare request for AI service
 $aiRequest = [
     'user_id' => $userId,
@@ -61,30 +53,15 @@ $aiRequest = [
         'equipment' => $profile['equipment'],
         'constraints' => $profile['constraints_text'],
         'availability' => $profile['availability'] ? json_decode($profile['availability'], true) : null
-    ],
-    'exercises' => $exercises
+    ]
 ];
 
 // Call AI service
-$aiUrl = AI_SERVICE_URL . '/generate_plan';
-$ch = curl_init($aiUrl);
-
-curl_setopt_array($ch, [
-    CURLOPT_POST => true,
-    CURLOPT_POSTFIELDS => json_encode($aiRequest),
-    CURLOPT_HTTPHEADER => [
-        'Content-Type: application/json',
-        'Accept: application/json'
-    ],
-    CURLOPT_RETURNTRANSFER => true,
-    CURLOPT_TIMEOUT => AI_SERVICE_TIMEOUT,
-    CURLOPT_CONNECTTIMEOUT => 10
-]);
-
-$response = curl_exec($ch);
-$httpCode = curl_getinfo($ch, CURLINFO_HTTP_CODE);
-$curlError = curl_error($ch);
-curl_close($ch);
+$result = AIService::postPlanRequest('/generate_plan', $aiRequest);
+
+$response = $result['body'];
+$httpCode = $result['http_code'];
+$curlError = $result['error'];
 
 if ($curlError) {
     error_log('AI service curl error: ' . $curlError);
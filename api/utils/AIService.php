@@ -0,0 +1,127 @@
+<?php
+/**
+ * AI Service Client
+ *
+ * Calls the Python plan service using the server-side exercise catalog.
+ * Plan requests send only a catalog_version; when the service reports the
+ * version as stale (HTTP 409) the exercises table is uploaded and the
+ * request is retried once.
+ */
+
+require_once __DIR__ . '/../db.php';
+
+class AIService
+{
+    /**
+     * Cached catalog version file
+     */
+    private static function versionFile(): string
+    {
+        return sys_get_temp_dir() . '/fitai_catalog_version';
+    }
+
+    /**
+     * POST a plan request (generate_plan / adjust_plan)
+     *
+     * Returns ['body' => string|false, 'http_code' => int, 'error' => string]
+     */
+    public static function postPlanRequest(string $endpoint, array $payload): array
+    {
+        $version = self::getCatalogVersion();
+        if ($version === null) {
+            $version = self::uploadCatalog();
+        }
+
+        $payload['catalog_version'] = $version;
+        $result = self::request('POST', $endpoint, $payload);
+
+        if ($result['http_code'] === 409) {
+            // Service has a different catalog (restart or admin edit)
+            $payload['catalog_version'] = self::uploadCatalog();
+            $result = self::request('POST', $endpoint, $payload);
+        }
+
+        return $result;
+    }
+
+    /**
+     * Upload the full exercises table and cache the returned version
+     */
+    public static function uploadCatalog(): ?string
+    {
+        $exercises = Database::fetchAll(
+            'SELECT name, muscle_group, equipment, difficulty, description
+             FROM exercises
+             ORDER BY muscle_group, difficulty, id'
+        );
+
+        // Catalog replacement is an admin call on the service
+        $result = self::request('PUT', '/catalog', ['exercises' => $exercises], [
+            'X-Admin-Token: ' . AI_ADMIN_TOKEN
+        ]);
+        if ($result['error'] || $result['http_code'] !== 200) {
+            error_log('AI catalog upload failed: HTTP ' . $result['http_code'] . ' ' . $result['error']);
+            return null;
+        }
+
+        $data = json_decode($result['body'], true);
+        $version = $data['version'] ?? null;
+
+        if ($version) {
+            @file_put_contents(self::versionFile(), $version, LOCK_EX);
+        }
+
+        return $version;
+    }
+
+    /**
+     * Forget the cached version so the next plan request re-uploads
+     *
+     * Call after any change to the exercises table. The upload needs
+     * AI_ADMIN_TOKEN to match the service's FITAI_ADMIN_TOKEN.
+     */
+    public static function invalidateCatalog(): void
+    {
+        @unlink(self::versionFile());
+    }
+
+    /**
+     * Cached catalog version, if any
+     */
+    private static function getCatalogVersion(): ?string
+    {
+        $version = @file_get_contents(self::versionFile());
+        return $version ? trim($version) : null;
+    }
+
+    /**
+     * Send a JSON request to the AI service
+     */
+    private static function request(string $method, string $endpoint, array $data, array $headers = []): array
+    {
+        $ch = curl_init(AI_SERVICE_URL . $endpoint);
+
+        curl_setopt_array($ch, [
+            CURLOPT_CUSTOMREQUEST => $method,
+            CURLOPT_POSTFIELDS => json_encode($data),
+            CURLOPT_HTTPHEADER => array_merge([
+                'Content-Type: application/json',
+                'Accept: application/json'
+            ], $headers),
+            CURLOPT_RETURNTRANSFER => true,
+            CURLOPT_TIMEOUT => AI_SERVICE_TIMEOUT,
+            CURLOPT_CONNECTTIMEOUT => 10
+        ]);
+
+        $response = curl_exec($ch);
+        $httpCode = curl_getinfo($ch, CURLINFO_HTTP_CODE);
+        $curlError = curl_error($ch);
+        curl_close($ch);
+
+        return [
+            'body' => $response,
+            'http_code' => $httpCode,
+            'error' => $curlError
+        ];
+    }
+}
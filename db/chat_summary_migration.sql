@@ -0,0 +1,7 @@
+-- Chat Rolling Summary Migration
+-- Run: SOURCE db/chat_summary_migration.sql;
+
+-- Last message folded into the conversation summary; messages after it
+-- are added to the summary incrementally
+ALTER TABLE chat_conversations ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE chat_conversations ADD COLUMN IF NOT EXISTS summarized_message_id INT DEFAULT 0;